@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Background price refresh for the scraper servers
+Serves the last snapshot immediately, scrapes on a worker thread
+
+A scrape takes minutes (page loads plus polite sleeps), so request handlers
+never run update_prices() themselves. A PriceRefresher runs it on a daemon
+thread, on a timer and on demand. Only one refresh runs at a time: asking
+while one is in flight joins it instead of starting another.
+
+GET handlers return snapshot(): the cached prices plus 'stale', 'refreshing'
+and 'age_minutes'. A stale snapshot also kicks off a background refresh
+(stale-while-revalidate), at most once per retry_after so a site that keeps
+blocking us is not hammered by every page load.
+
+Each scraper server builds one refresher around its own update_prices() and
+cache loader, then shares the rest from here:
+
+    refresher = PriceRefresher(update_prices, load_cached_prices)
+    app.register_blueprint(price_routes(refresher))   # GET /api/prices, POST /api/prices/refresh
+    start_in_server(refresher)                        # in __main__, before app.run(debug=True)
+"""
+
+import json
+import os
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from flask import Blueprint, jsonify, request
+
+
+def save_json(path, data):
+    """Write JSON via a temp file and rename, so a request never reads a half-written cache"""
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+class Refresh:
+    """One update_prices() run, shared by everyone who asks while it is in flight"""
+
+    def __init__(self):
+        self.started = datetime.now()
+        self.error = None           # "Type: message" if update_prices() raised
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the run finishes; False on timeout"""
+        return self._done.wait(timeout)
+
+    def done(self):
+        return self._done.is_set()
+
+
+class PriceRefresher:
+    def __init__(self, update, load, max_age=timedelta(hours=1), interval=timedelta(hours=1),
+                 retry_after=timedelta(minutes=10)):
+        self.update = update        # scrapes and saves the cache
+        self.load = load            # reads the cache
+        self.max_age = max_age      # older snapshots are served as stale
+        self.interval = interval    # timer period
+        self.retry_after = retry_after  # min gap between refreshes started by stale reads
+        self.last_error = None
+        self.last_started = None
+        self._lock = threading.Lock()
+        self._running = None        # Refresh in flight
+        self._timer = None
+
+    def refreshing(self):
+        return self._running is not None
+
+    def refresh(self, wait=False, timeout=None):
+        """The Refresh in flight, started if there is none; with wait, returned once it finishes"""
+        with self._lock:
+            run = self._running
+            if run is None:
+                run = self._running = Refresh()
+                self.last_started = run.started
+                threading.Thread(target=self._run, args=(run,), name='price-refresh', daemon=True).start()
+        if wait:
+            run.wait(timeout)
+        return run
+
+    def _run(self, run):
+        try:
+            self.update()
+        except Exception as e:
+            traceback.print_exc()
+            run.error = f"{type(e).__name__}: {e}"
+        finally:
+            with self._lock:
+                self._running = None
+                self.last_error = run.error
+            run._done.set()
+
+    def age(self, cache):
+        """Age of a cache dict, or None if it has no timestamp"""
+        try:
+            return datetime.now() - datetime.fromisoformat(cache['timestamp'])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def snapshot(self):
+        """Cached prices with staleness flags; refreshes in the background when stale"""
+        cache = self.load() or {}
+        age = self.age(cache)
+        stale = age is None or age >= self.max_age
+        if stale and (self.last_started is None or datetime.now() - self.last_started >= self.retry_after):
+            self.refresh()
+        return dict(cache,
+                    stale=stale,
+                    refreshing=self.refreshing(),
+                    age_minutes=None if age is None else age.total_seconds() / 60,
+                    last_error=self.last_error)
+
+    def start(self, now=True):
+        """Refresh every interval on a daemon thread; with now, refresh first if the cache is stale"""
+        if self._timer is not None:
+            return
+        def loop():
+            age = self.age(self.load() or {}) if now else timedelta(0)
+            while True:
+                if age is None or age >= self.interval:
+                    self.refresh(wait=True)
+                    age = timedelta(0)
+                time.sleep((self.interval - age).total_seconds())
+                age = self.age(self.load() or {})
+        self._timer = threading.Thread(target=loop, name='price-refresh-timer', daemon=True)
+        self._timer.start()
+
+
+def price_routes(refresher):
+    """Blueprint with the price endpoints served from `refresher`"""
+    bp = Blueprint('prices', __name__)
+
+    @bp.route('/api/prices', methods=['GET'])
+    def get_prices():
+        """Get current prices (last snapshot; stale ones refresh in the background)"""
+        return jsonify(refresher.snapshot())
+
+    @bp.route('/api/prices/refresh', methods=['POST'])
+    def refresh_prices():
+        """Start a refresh (joins one already running); ?wait=1 blocks until it is done"""
+        wait = request.args.get('wait', '').lower() in ('1', 'true', 'yes')
+        run = refresher.refresh(wait=wait)
+        if not wait:
+            return jsonify(refresher.snapshot()), 202
+        if run.error:
+            # the scrape itself failed; say so instead of passing the old snapshot off as fresh
+            return jsonify(dict(refresher.snapshot(), error=run.error)), 502
+        return jsonify(refresher.snapshot())
+
+    return bp
+
+def start_in_server(refresher, now=True, debug=True):
+    """refresher.start(), in the process that will serve requests"""
+    # app.run(debug=True) runs the script twice (reloader parent + server child); only the child scrapes
+    if debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return
+    refresher.start(now=now)
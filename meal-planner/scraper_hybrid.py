@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 from playwright.sync_api import sync_playwright
 import time
 import re
+from price_refresher import PriceRefresher, price_routes, save_json, start_in_server
 
 app = Flask(__name__)
 
@@ -75,8 +76,7 @@ def load_cache():
 
 def save_cache(data):
     """Save prices to cache"""
-    with open(CACHE_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    save_json(CACHE_FILE, data)
 
 def scrape_with_playwright(url, store_name):
     """Try to scrape a single product page"""
@@ -226,24 +226,8 @@ def add_demo_prices(results):
     
     return results
 
-@app.route('/api/prices', methods=['GET'])
-def get_prices():
-    """Get current prices"""
-    cache = load_cache()
-    
-    # Return cached if fresh (< 1 hour)
-    if cache.get('timestamp'):
-        cache_time = datetime.fromisoformat(cache['timestamp'])
-        if datetime.now() - cache_time < timedelta(hours=1):
-            return jsonify(cache)
-    
-    # Try to update
-    return jsonify(update_prices())
-
-@app.route('/api/prices/refresh', methods=['POST'])
-def refresh_prices():
-    """Force refresh prices"""
-    return jsonify(update_prices())
+refresher = PriceRefresher(update_prices, load_cache)
+app.register_blueprint(price_routes(refresher))
 
 @app.route('/api/prices/manual', methods=['POST'])
 def save_manual_prices():
@@ -285,6 +269,8 @@ def get_status():
         'status': 'ok' if age < timedelta(hours=2) else 'stale',
         'last_update': cache.get('timestamp'),
         'age_minutes': age.total_seconds() / 60,
+        'refreshing': refresher.refreshing(),
+        'last_error': refresher.last_error,
         'method': cache.get('status', {}).get('method', 'unknown'),
         'is_manual': cache.get('manual', False),
         'coles_items': len(cache.get('coles', {})),
@@ -297,12 +283,15 @@ if __name__ == '__main__':
     print("  - Tries automatic scraping first")
     print("  - Falls back to demo prices if blocked")
     print("  - Supports manual price entry via API")
+    print("  - Background refresh every hour (requests never wait on a scrape)")
     print("")
     print("API Endpoints:")
     print("  GET  /api/prices         - Get current prices")
-    print("  POST /api/prices/refresh - Force refresh (try scraping)")
+    print("  POST /api/prices/refresh - Start a scrape (?wait=1 to block)")
     print("  POST /api/prices/manual  - Save manual prices")
     print("  GET  /api/prices/status  - Check status")
     print("")
     
+    start_in_server(refresher)
+    
     app.run(debug=True, port=5002, host='0.0.0.0')
\ No newline at end of file
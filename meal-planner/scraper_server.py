@@ -14,6 +14,7 @@ import random
 import os
 from datetime import datetime, timedelta
 from functools import lru_cache
+from price_refresher import PriceRefresher, price_routes, save_json, start_in_server
 
 app = Flask(__name__)
 
@@ -86,8 +87,7 @@ def load_cached_prices():
 
 def save_cached_prices(prices):
     """Save prices to cache file"""
-    with open(CACHE_FILE, 'w') as f:
-        json.dump(prices, f, indent=2)
+    save_json(CACHE_FILE, prices)
 
 def get_random_headers():
     """Get random headers to avoid detection"""
@@ -488,24 +488,8 @@ def update_prices():
     
     return result
 
-@app.route('/api/prices', methods=['GET'])
-def get_prices():
-    """Get current prices (from cache or fresh scrape)"""
-    cache = load_cached_prices()
-    
-    # Check if cache is stale (older than 1 hour)
-    if cache:
-        cache_time = datetime.fromisoformat(cache.get('timestamp', '2000-01-01'))
-        if datetime.now() - cache_time < timedelta(hours=1):
-            return jsonify(cache)
-    
-    # Update prices
-    return jsonify(update_prices())
-
-@app.route('/api/prices/refresh', methods=['POST'])
-def refresh_prices():
-    """Force refresh of prices"""
-    return jsonify(update_prices())
+refresher = PriceRefresher(update_prices, load_cached_prices)
+app.register_blueprint(price_routes(refresher))
 
 @app.route('/api/prices/status', methods=['GET'])
 def get_status():
@@ -522,6 +506,8 @@ def get_status():
         'status': 'ok' if age < timedelta(hours=2) else 'stale',
         'last_update': cache.get('timestamp'),
         'age_minutes': age.total_seconds() / 60,
+        'refreshing': refresher.refreshing(),
+        'last_error': refresher.last_error,
         'coles_items': len(cache.get('coles', {})),
         'woolies_items': len(cache.get('woolworths', {}))
     })
@@ -531,15 +517,14 @@ if __name__ == '__main__':
     print("Features:")
     print("  - Rotating user agents to avoid blocking")
     print("  - Retry logic with exponential backoff")
-    print("  - Automatic caching (1 hour refresh)")
+    print("  - Background refresh every hour (requests never wait on a scrape)")
     print("  - Fallback to cached data if scraping fails")
     print("")
     print("API Endpoints:")
     print("  GET  /api/prices         - Get current prices")
-    print("  POST /api/prices/refresh - Force refresh")
+    print("  POST /api/prices/refresh - Start a refresh (?wait=1 to block)")
     print("  GET  /api/prices/status  - Check scraper status")
     
-    # Initial scrape on startup
-    update_prices()
+    start_in_server(refresher)  # scrapes on startup if the cache is stale, then hourly
     
     app.run(debug=True, port=5002, host='0.0.0.0')
\ No newline at end of file
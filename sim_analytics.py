@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Performance metrics for a Wick-Magic simulator run.
+
+analyze() takes the trade log and the per-bar equity curve (DataFrames with
+the sim_output columns, or the lists of row dicts the bar loop fills) and
+computes everything with whole-column NumPy/pandas ops, cheap enough to run
+on every variant of a sweep:
+
+  sharpe, sortino          annualized from per-bar equity returns (risk-free 0)
+  max_drawdown_pct         largest peak-to-trough fall of equity
+  max_drawdown_days        longest time spent below a previous peak
+  exposure_pct             share of bars with at least one open position
+  avg_deployed_pct         mean invested / equity
+  turnover                 bought + sold USDT over mean equity
+  win_rate_pct, profit_factor, avg_pnl, avg_hold_hours (closed trades)
+  per_symbol               pnl, trades, hit rate and hold time per symbol
+
+  python sim_analytics.py
+  python sim_analytics.py --trade-log trade_log.parquet --equity equity_curve.parquet
+"""
+import os
+import json
+import argparse
+import pandas as pd
+import numpy as np
+
+from sim_data import parse_timeframe
+from sim_output import TRADE_COLS, EQUITY_COLS, read_output
+
+YEAR_MS = 365 * 24 * 60 * 60 * 1000
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def json_safe(obj):
+    """`obj` with NaN/inf floats (e.g. sharpe of a flat run) as None, so json.dump writes strict JSON."""
+    if isinstance(obj, dict):
+        return {k: json_safe(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [json_safe(v) for v in obj]
+    if isinstance(obj, (float, np.floating)) and not np.isfinite(obj):
+        return None
+    return obj
+
+def as_frame(rows, columns):
+    return rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows), columns=columns)
+
+def round_trips(trades):
+    """Closed trades as one row each: symbol, entry_ts, exit_ts, pnl (k-th SELL closes the k-th BUY per symbol)."""
+    side = trades['side']
+    buys, sells = trades[side == 'BUY'], trades[side == 'SELL']
+    buys = buys.assign(n=buys.groupby('symbol').cumcount())
+    sells = sells.assign(n=sells.groupby('symbol').cumcount())
+    rt = sells[['symbol', 'n', 'ts', 'pnl']].merge(buys[['symbol', 'n', 'ts']], on=['symbol', 'n'], suffixes=('', '_entry'))
+    return rt.rename(columns={'ts': 'exit_ts', 'ts_entry': 'entry_ts'})[['symbol', 'entry_ts', 'exit_ts', 'pnl']]
+
+def equity_metrics(equity, start, bar_ms):
+    eq = equity['equity'].to_numpy(dtype=float)
+    ts = equity['ts'].to_numpy(dtype=np.int64)
+    if not len(eq):
+        return {'sharpe': np.nan, 'sortino': np.nan, 'max_drawdown_pct': 0.0, 'max_drawdown_days': 0.0,
+                'exposure_pct': 0.0, 'avg_deployed_pct': 0.0}
+    # the start value sits one bar before the first snapshot
+    eq = np.r_[start, eq]
+    ts = np.r_[ts[0] - bar_ms, ts]
+    rets = eq[1:] / eq[:-1] - 1
+    ann = np.sqrt(YEAR_MS / bar_ms)
+    std = rets.std(ddof=1) if len(rets) > 1 else np.nan
+    downside = np.sqrt(np.mean(np.minimum(rets, 0.0) ** 2))
+    peak = np.maximum.accumulate(eq)
+    idx = np.arange(len(eq))
+    last_peak = np.maximum.accumulate(np.where(eq >= peak, idx, 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'sharpe': float(rets.mean() / std * ann) if std > 0 else np.nan,
+            'sortino': float(rets.mean() / downside * ann) if downside > 0 else np.nan,
+            'max_drawdown_pct': float(np.max(1 - eq / peak) * 100),
+            'max_drawdown_days': float(np.max(ts - ts[last_peak]) / DAY_MS),
+            'exposure_pct': float((equity['positions'].to_numpy() > 0).mean() * 100),
+            'avg_deployed_pct': float(np.nanmean(equity['invested'].to_numpy(dtype=float) / eq[1:]) * 100),
+        }
+
+def trade_metrics(trades, mean_equity):
+    rt = round_trips(trades)
+    pnl = rt['pnl'].to_numpy(dtype=float)
+    gross_win, gross_loss = pnl[pnl > 0].sum(), -pnl[pnl < 0].sum()
+    hold_h = (rt['exit_ts'] - rt['entry_ts']).to_numpy(dtype=float) / 3600000
+    return rt, {
+        'closed_trades': int(len(pnl)),
+        'win_rate_pct': float((pnl > 0).mean() * 100) if len(pnl) else np.nan,
+        'profit_factor': float(gross_win / gross_loss) if gross_loss > 0 else np.nan,
+        'avg_pnl': float(pnl.mean()) if len(pnl) else np.nan,
+        'avg_hold_hours': float(hold_h.mean()) if len(hold_h) else np.nan,
+        'turnover': float(trades['usdt'].sum() / mean_equity) if mean_equity > 0 else np.nan,
+    }
+
+def per_symbol(rt):
+    hold_h = (rt['exit_ts'] - rt['entry_ts']) / 3600000
+    g = rt.assign(win=rt['pnl'] > 0, hold_hours=hold_h).groupby('symbol')
+    out = pd.DataFrame({'pnl': g['pnl'].sum(), 'trades': g.size(), 'hit_rate_pct': g['win'].mean() * 100,
+                        'avg_hold_hours': g['hold_hours'].mean()})
+    return out.sort_values('pnl', ascending=False)
+
+def analyze(trades, equity, start, bar_ms, by_symbol=True):
+    """Metrics dict for one run at `bar_ms` per equity bar; `by_symbol` adds the per_symbol table (as a dict) too."""
+    trades = as_frame(trades, TRADE_COLS)
+    equity = as_frame(equity, EQUITY_COLS)
+    out = equity_metrics(equity, start, bar_ms)
+    mean_equity = equity['equity'].mean() if len(equity) else start
+    rt, tm = trade_metrics(trades, mean_equity)
+    out.update(tm)
+    if by_symbol:
+        out['per_symbol'] = per_symbol(rt).to_dict('index')
+    return out
+
+def main():
+    import sim_wickgun_sim as sim  # CLI defaults only; the engine imports this module
+    ap = argparse.ArgumentParser(description='Performance metrics for a simulator run')
+    ap.add_argument('--trade-log', default=f'trade_log.{sim.OUTPUT_FORMAT}')
+    ap.add_argument('--equity', default=f'equity_curve.{sim.OUTPUT_FORMAT}')
+    ap.add_argument('--start', type=float, default=None, help='starting USDT (default: summary.json, else START_USDT)')
+    ap.add_argument('--resolution', default=sim.RESOLUTION, help='bar size of the equity curve (default: RESOLUTION)')
+    ap.add_argument('--out', default='analytics.json')
+    args = ap.parse_args()
+
+    start = args.start
+    if start is None:
+        start = sim.START_USDT
+        if os.path.exists('summary.json'):
+            with open('summary.json') as f:
+                start = json.load(f).get('start', start)
+    report = analyze(read_output(args.trade_log), read_output(args.equity), start,
+                     parse_timeframe(args.resolution) * 1000)
+    with open(args.out, 'w') as f:
+        json.dump(json_safe(report), f, indent=2)
+    flat = {k: v for k, v in report.items() if k != 'per_symbol'}
+    print(json.dumps(flat, indent=2))
+    print(pd.DataFrame.from_dict(report['per_symbol'], orient='index').to_string())
+    print('Wrote', args.out)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the Wick-Magic simulator engine on seeded synthetic candles.
+Each case runs simulate() itself in a fresh process (so peak RSS is per case),
+with the synthetic candles as its data source, and reports the seconds per
+stage from simulate()'s own Profiler (markets, tickers, candles, features,
+scoring, fill_data, loop, output) plus the time to generate the data. Output:
+JSON with bars/sec, peak RSS and seconds per stage, to compare engine changes.
+
+  python sim_bench.py --suite quick
+  python sim_bench.py --suite symbols --out bench_symbols.json
+  python sim_bench.py --symbols 5,50 --days 30,365 --resolution 15m
+
+Suites: quick, symbols (5 -> 500), days (30 -> 730), resolution (15m -> 1m), full.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import itertools
+import resource
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import pandas as pd
+import numpy as np
+
+import sim_wickgun_sim as sim
+from sim_data import DataSource, parse_timeframe, slice_window
+from sim_profile import Profiler
+from sim_config import SimConfig, add_arguments, configure
+
+SUITES = {
+    'quick': [(5, 30, '15m'), (20, 30, '15m')],
+    'symbols': [(n, 30, '15m') for n in (5, 50, 200, 500)],
+    'days': [(5, d, '15m') for d in (30, 180, 365, 730)],
+    'resolution': [(5, 30, tf) for tf in ('15m', '5m', '1m')],
+}
+SUITES['full'] = SUITES['symbols'] + SUITES['days'] + SUITES['resolution']
+BENCH_END_MS = 1767225600000  # fixed clock (2026-01-01 UTC) so every run sees the same data
+
+
+def synth_ohlcv(n_bars, tf_ms, end_ms, rng, vol_year=0.9, drift_year=0.0,
+                wick_prob=0.03, wick_scale=0.02, spike_prob=0.01, spike_mult=8.0, start_price=None):
+    """Seeded GBM closes with occasional long wicks and volume spikes -> (N, 6) ccxt-style rows."""
+    dt = tf_ms / (365 * 86400 * 1000)
+    ret = rng.normal((drift_year - 0.5 * vol_year**2) * dt, vol_year * np.sqrt(dt), n_bars)
+    close = (start_price or float(rng.uniform(0.01, 50000))) * np.exp(np.cumsum(ret))
+    open_ = np.r_[close[0], close[:-1]]
+    body_hi, body_lo = np.maximum(open_, close), np.minimum(open_, close)
+    base_wick = np.abs(rng.normal(0, vol_year * np.sqrt(dt) * 0.5, (2, n_bars)))
+    wick = rng.random((2, n_bars)) < wick_prob
+    extra = rng.exponential(wick_scale, (2, n_bars)) * wick
+    high = body_hi * (1 + base_wick[0] + extra[0])
+    low = body_lo * np.maximum(1 - base_wick[1] - extra[1], 0.05)
+    volume = rng.lognormal(10, 0.5, n_bars) * np.where(rng.random(n_bars) < spike_prob, spike_mult, 1.0)
+    ts = end_ms - (n_bars - np.arange(n_bars)) * tf_ms
+    return np.column_stack([ts, open_, high, low, close, volume]).astype(float)
+
+
+class SyntheticSource(DataSource):
+    """In-memory DataSource over synth_ohlcv series; only serves its base timeframe."""
+    id = 'synthetic'
+    cacheable = False
+
+    def __init__(self, n_symbols, days, timeframe='15m', seed=0, end_ms=BENCH_END_MS, **gen_kw):
+        self.timeframe = timeframe
+        self.end_ms = end_ms
+        tf_ms = parse_timeframe(timeframe) * 1000
+        n_bars = days * 86400 * 1000 // tf_ms
+        self.symbols = [f'S{j:03d}/USDT' for j in range(n_symbols)]
+        self.candles = {s: synth_ohlcv(n_bars, tf_ms, end_ms, np.random.default_rng([seed, j]), **gen_kw)
+                        for j, s in enumerate(self.symbols)}
+
+    def load_markets(self):
+        return {s: {'symbol': s, 'spot': True} for s in self.symbols}
+
+    def fetch_tickers(self, symbols=None):
+        # quoteVolume falls with the symbol number so the top-N ranking is deterministic
+        out = {}
+        for j, s in enumerate(self.symbols):
+            last = float(self.candles[s][-1, 4])
+            out[s] = {'symbol': s, 'last': last, 'bid': last * 0.9995, 'ask': last * 1.0005,
+                      'quoteVolume': float(len(self.symbols) - j) * 1e6}
+        return out if symbols is None else {s: out[s] for s in symbols if s in out}
+
+    def fetch_ohlcv(self, symbol, timeframe='15m', since=None, limit=None):
+        if timeframe != self.timeframe or symbol not in self.candles:
+            raise LookupError(f'no synthetic candles for {symbol} {timeframe}')
+        return slice_window(self.candles[symbol], since, limit)
+
+    def milliseconds(self):
+        return self.end_ms
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024  # bytes on macOS, KB on Linux
+
+def run_case(n_symbols, days, resolution, seed=0, config=None):
+    # the case's axes on top of the run's settings (a spawned case starts from the engine defaults)
+    config = config or SimConfig.from_module(sim)
+    config.override({'days': days, 'resolution': resolution, 'top_n': n_symbols}).apply(sim)
+    params = sim.default_params(MAX_PAIRS=max(1, n_symbols // 2))
+    t0 = time.perf_counter()
+    src = SyntheticSource(n_symbols, days, resolution, seed)
+    generate = time.perf_counter() - t0
+    prof = Profiler()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # simulate() writes its trade log, equity curve and summary.json to the working directory
+        os.chdir(tmp)
+        try:
+            sim.simulate(params=params, source=src, prof=prof)
+            with open('summary.json') as f:
+                summary = json.load(f)
+        finally:
+            os.chdir(cwd)
+    report = prof.report()
+    counters = report['counters']
+    bars = counters.get('candles', {}).get('candles', 0)
+    total, loop = report['total_sec'], report['stages_sec'].get('loop')
+    return {
+        'symbols': n_symbols, 'days': days, 'resolution': resolution, 'seed': seed,
+        'bars': bars, 'timeline': counters['features']['timeline'], 'trades': summary['trades'],
+        'bars_per_sec': bars / total if total else None,
+        'loop_bars_per_sec': bars / loop if loop else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'stages_sec': {'generate': round(generate, 4), **report['stages_sec']},
+        'total_sec': total,
+        'return_pct': summary['return_pct'],
+        'counters': counters,
+    }
+
+def run_isolated(case, seed, config=None):
+    # fresh interpreter per case: ru_maxrss only ever grows within a process
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(run_case, *case, seed, config).result()
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark the Wick-Magic simulator on synthetic candles')
+    ap.add_argument('--suite', choices=sorted(SUITES), default=None)
+    ap.add_argument('--symbols', default=None, help='comma list, e.g. 5,50,500')
+    ap.add_argument('--days', default=None, help='comma list, e.g. 30,365')
+    ap.add_argument('--resolution', default=None, help='comma list, e.g. 15m,1m')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--out', default='bench_results.json')
+    add_arguments(ap, exclude=('days', 'resolution', 'top_n'))  # those are the case axes above
+    args = ap.parse_args()
+    config = configure(args, sim)
+
+    if args.symbols or args.days or args.resolution:
+        cases = list(itertools.product([int(x) for x in (args.symbols or '5').split(',')],
+                                       [int(x) for x in (args.days or '30').split(',')],
+                                       (args.resolution or '15m').split(',')))
+    else:
+        cases = SUITES[args.suite or 'quick']
+    results = []
+    for case in cases:
+        r = run_isolated(case, args.seed, config)
+        results.append(r)
+        print(f"{r['symbols']:>4} sym {r['days']:>4} d {r['resolution']:>4}: {r['bars']:>10} bars  "
+              f"{r['bars_per_sec']:>12,.0f} bars/s  {r['peak_rss_mb']:>8.1f} MB  {r['stages_sec']}")
+    report = {
+        'env': {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+                'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'cases': results,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print('Wrote', args.out)
+
+if __name__ == '__main__':
+    main()
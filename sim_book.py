@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Array-backed position book for the Wick-Magic simulator.
+
+One slot per grid symbol (indexed by grid column), preallocated, with an
+`active` mask instead of a dict of dicts, so per-bar work over the open
+positions (exit checks, marking) is a handful of vectorized ops no matter
+how many are open. `seq` records entry order, so anything that has to walk
+positions one by one (trade rows, cash updates) can still do it in the order
+the old dict would have.
+"""
+import numpy as np
+
+STATE_FIELDS = ('entry_price', 'qty', 'size_usdt', 'entry_ts', 'seq', 'active')
+
+
+class PositionBook:
+    def __init__(self, n_symbols):
+        self.entry_price = np.zeros(n_symbols)
+        self.qty = np.zeros(n_symbols)
+        self.size_usdt = np.zeros(n_symbols)
+        self.entry_ts = np.zeros(n_symbols, dtype=np.int64)
+        self.seq = np.zeros(n_symbols, dtype=np.int64)
+        self.active = np.zeros(n_symbols, dtype=bool)
+        self.n_open = 0
+        self.n_entries = 0
+
+    def __len__(self):
+        return self.n_open
+
+    def __contains__(self, col):
+        return bool(self.active[col])
+
+    def open(self, col, ts, price, usdt, qty):
+        self.entry_price[col] = price
+        self.qty[col] = qty
+        self.size_usdt[col] = usdt
+        self.entry_ts[col] = ts
+        self.seq[col] = self.n_entries
+        self.active[col] = True
+        self.n_open += 1
+        self.n_entries += 1
+
+    def close(self, cols):
+        self.active[cols] = False
+        self.n_open -= len(cols)
+
+    def state(self):
+        return {**{k: getattr(self, k) for k in STATE_FIELDS}, 'n_entries': self.n_entries}
+
+    def restore(self, state):
+        for k in STATE_FIELDS:
+            getattr(self, k)[:] = state[k]
+        self.n_open = int(self.active.sum())
+        self.n_entries = int(state['n_entries'])
+
+    def held(self, mask=None):
+        """Open columns (optionally only where `mask`), in entry order."""
+        cols = np.flatnonzero(self.active if mask is None else self.active & mask)
+        return cols[np.argsort(self.seq[cols], kind='stable')]
+
+    def value(self, prices, fallback=None):
+        """Sum of qty * price over open positions; NaN prices use `fallback` (e.g. entry_price)."""
+        cols = np.flatnonzero(self.active)
+        px = prices[cols]
+        if fallback is not None:
+            px = np.where(np.isnan(px), fallback[cols], px)
+        return float(self.qty[cols] @ px)
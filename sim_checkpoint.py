@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Checkpoints for long simulator runs.
+
+The bar loop's state (cash, the position book, risk buffers, rotation state,
+output writer positions) is saved every CHECKPOINT_SECONDS as one .npz file:
+nested state dicts are flattened to 'book/qty'-style keys, and a JSON header
+under '__meta__' records what the run was started with. The file is written
+to a temp name and renamed, so a kill mid-write leaves the previous one.
+
+A resumed run has to see exactly the same candles, so checkpointed runs read
+through a replay directory (recorded on the first run unless it already came
+from --replay) and resume from that.
+"""
+import os
+import io
+import json
+import time
+import numpy as np
+
+CHECKPOINT_PATH = 'sim_checkpoint.npz'
+CHECKPOINT_SECONDS = 60
+
+
+def flatten(state, prefix=''):
+    out = {}
+    for k, v in state.items():
+        if v is None:
+            continue
+        if isinstance(v, dict):
+            out.update(flatten(v, f'{prefix}{k}/'))
+        else:
+            out[prefix + k] = np.asarray(v)
+    return out
+
+def unflatten(arrays):
+    state = {}
+    for key, arr in arrays.items():
+        *parents, name = key.split('/')
+        d = state
+        for p in parents:
+            d = d.setdefault(p, {})
+        d[name] = arr.item() if arr.ndim == 0 else arr
+    return state
+
+def save_checkpoint(path, state, meta):
+    buf = io.BytesIO()
+    np.savez(buf, __meta__=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8), **flatten(state))
+    with open(path + '.tmp', 'wb') as f:
+        f.write(buf.getvalue())
+    os.replace(path + '.tmp', path)
+
+def load_checkpoint(path):
+    """-> (state, meta) as saved; raises FileNotFoundError when there is none."""
+    with np.load(path) as z:
+        arrays = {k: z[k] for k in z.files}
+    meta = json.loads(arrays.pop('__meta__').tobytes().decode())
+    return unflatten(arrays), meta
+
+
+class Checkpointer:
+    """Handed to run_bar_loop; saves its state at most every `every` seconds."""
+
+    def __init__(self, path=CHECKPOINT_PATH, every=CHECKPOINT_SECONDS, meta=None):
+        self.path = path
+        self.every = every
+        self.meta = meta or {}
+        self.last = time.monotonic()
+        self.saved = 0
+
+    def due(self):
+        return time.monotonic() - self.last >= self.every
+
+    def save(self, state):
+        save_checkpoint(self.path, state, self.meta)
+        self.last = time.monotonic()
+        self.saved += 1
+
+    def clear(self):
+        # the run finished; a later --resume must not pick this up
+        if os.path.exists(self.path):
+            os.remove(self.path)
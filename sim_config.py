@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Typed run configuration for the Wick-Magic simulator.
+
+One SimConfig holds every module-level setting of sim_wickgun_sim, grouped by
+the component that reads it:
+
+  strategy   rotation and entry/exit rules (PER_BUY, MAX_PAIRS, weights, ...)
+  data       which candles and where they live (DAYS, RESOLUTION, TOP_N, UNIVERSE,
+             CACHE_DIR, GRID_STORE, GRID_DTYPE)
+  fills      FILL_PATH and costs (SLIPPAGE_MODEL, FEE_RATE, SLIPPAGE)
+  portfolio  START_USDT and the sim_risk caps
+  output     OUTPUT_FORMAT
+
+Field names are the module constants in lower case. Option-valued fields
+(fill_path, slippage_model, universe, output_format, grid_dtype, resolution)
+are Literals over the owning module's option list, so a typo is rejected here
+instead of silently running something else. Defaults are read from
+the engine module itself (SimConfig.from_module), a JSON or YAML file
+overrides any subset by section, and CLI flags (--per-buy 30 --fill-path ohlc)
+override both. apply() writes the result back onto the module, which is what
+the old per-variant copies of the script did by hand:
+
+  {"strategy": {"per_buy": 30, "max_pairs": 6}, "fills": {"fill_path": "ohlc"}}
+
+  python sim_wickgun_sim.py --config sim_configs/sim_tmp_1.json --replay replay_dir
+  python sim_wickgun_sim.py --config run.yaml --max-pairs 10 --print-config
+
+The sweep, walk-forward, paper, screener and bench CLIs take the same --config
+and flags (configure()), so e.g. a sweep under FILL_PATH=ohlc is
+
+  python sim_sweep.py --fill-path ohlc --set GAIN_TARGET=0.015,0.025
+"""
+import json
+import typing
+from dataclasses import dataclass, fields, replace, asdict
+from typing import Literal, Optional
+
+from sim_fills import FILL_PATHS
+from sim_costs import SLIPPAGE_MODELS
+from sim_output import OUTPUT_FORMATS
+from sim_gridstore import GRID_DTYPES
+from sim_resample import BASE_TIMEFRAMES
+
+UNIVERSES = ('volume', 'screener')  # sim_wickgun_sim.UNIVERSE
+
+
+@dataclass(frozen=True)
+class StrategyConfig:
+    per_buy: float
+    max_pairs: int
+    gain_target: float
+    stop_loss: float
+    recalc_interval: int  # seconds
+    rolling_scores: bool
+    w_retr: float
+    w_pump: float
+    w_spike: float
+    w_wicks: float
+
+@dataclass(frozen=True)
+class DataConfig:
+    days: int
+    resolution: Literal[BASE_TIMEFRAMES]
+    top_n: int
+    universe: Literal[UNIVERSES]
+    cache_dir: Optional[str]
+    grid_store: Optional[str]
+    grid_dtype: Literal[GRID_DTYPES]
+
+@dataclass(frozen=True)
+class FillConfig:
+    fill_path: Literal[FILL_PATHS]
+    slippage_model: Literal[SLIPPAGE_MODELS]
+    fee_rate: float
+    slippage: float
+
+@dataclass(frozen=True)
+class PortfolioConfig:
+    start_usdt: float
+    max_weight: Optional[float]
+    max_deployed: Optional[float]
+    max_corr_exposure: Optional[float]
+    corr_threshold: float
+
+@dataclass(frozen=True)
+class OutputConfig:
+    output_format: Literal[OUTPUT_FORMATS]
+
+SECTIONS = {'strategy': StrategyConfig, 'data': DataConfig, 'fills': FillConfig,
+            'portfolio': PortfolioConfig, 'output': OutputConfig}
+# field name -> section
+FIELD_SECTION = {f.name: name for name, cls in SECTIONS.items() for f in fields(cls)}
+
+
+def field_type(cls, name):
+    # (base type, optional, allowed values or None) from the annotation
+    tp = typing.get_type_hints(cls)[name]
+    optional = typing.get_origin(tp) is typing.Union
+    if optional:
+        tp = next(a for a in typing.get_args(tp) if a is not type(None))
+    if typing.get_origin(tp) is Literal:
+        choices = typing.get_args(tp)
+        return type(choices[0]), optional, choices
+    return tp, optional, None
+
+def coerce(section, name, value):
+    """`value` (from JSON/YAML or a CLI string) as the field's type; ValueError if it isn't one."""
+    base, optional, choices = field_type(SECTIONS[section], name)
+    if value is None or (isinstance(value, str) and value.lower() in ('none', 'null')):
+        if optional:
+            return None
+        raise ValueError(f'{section}.{name} cannot be null')
+    if base is bool:
+        if isinstance(value, str):
+            if value.lower() not in ('true', 'false', '1', '0', 'yes', 'no'):
+                raise ValueError(f'{section}.{name}: expected a boolean, got {value!r}')
+            return value.lower() in ('true', '1', 'yes')
+        return bool(value)
+    if base is int and isinstance(value, float) and not value.is_integer():
+        raise ValueError(f'{section}.{name}: expected an integer, got {value!r}')
+    try:
+        out = base(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{section}.{name}: expected {base.__name__}, got {value!r}') from None
+    if choices is not None and out not in choices:
+        raise ValueError(f'{section}.{name}: expected one of {", ".join(choices)}, got {value!r}')
+    return out
+
+
+@dataclass(frozen=True)
+class SimConfig:
+    strategy: StrategyConfig
+    data: DataConfig
+    fills: FillConfig
+    portfolio: PortfolioConfig
+    output: OutputConfig
+
+    @classmethod
+    def from_module(cls, module):
+        """The settings a module (sim_wickgun_sim) currently has."""
+        return cls(**{name: sec(**{f.name: getattr(module, f.name.upper()) for f in fields(sec)})
+                      for name, sec in SECTIONS.items()})
+
+    def flat(self):
+        # {'PER_BUY': 30.0, ...}, the module constant names
+        return {k.upper(): v for sec in asdict(self).values() for k, v in sec.items()}
+
+    def override(self, values):
+        """New config with `values` ({field: value}, flat; case-insensitive) replaced."""
+        by_section = {}
+        for key, value in values.items():
+            name = key.lower()
+            if name not in FIELD_SECTION:
+                raise ValueError(f'unknown setting {key!r}; expected one of {", ".join(FIELD_SECTION)}')
+            section = FIELD_SECTION[name]
+            by_section.setdefault(section, {})[name] = coerce(section, name, value)
+        return replace(self, **{s: replace(getattr(self, s), **v) for s, v in by_section.items()})
+
+    def merge(self, doc):
+        """New config with a file's {section: {field: value}} document applied."""
+        values = {}
+        for section, body in (doc or {}).items():
+            if section not in SECTIONS:
+                raise ValueError(f'unknown config section {section!r}; expected one of {", ".join(SECTIONS)}')
+            for name, value in (body or {}).items():
+                if FIELD_SECTION.get(name.lower()) != section:
+                    raise ValueError(f'{section}.{name} is not a setting of that section')
+                values[name] = value
+        return self.override(values)
+
+    def to_dict(self):
+        return asdict(self)
+
+    def apply(self, module):
+        # set the module constants, so default_params(), run_config() and the stages all see this config
+        for k, v in self.flat().items():
+            setattr(module, k, v)
+
+
+def read_config_file(path):
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit(f'{path}: YAML configs need PyYAML (pip install pyyaml); JSON works without it')
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def add_arguments(ap, exclude=()):
+    """--config plus one flag per setting (--per-buy, --fill-path, ...), all defaulting to unset.
+
+    `exclude` names settings the tool sets itself (e.g. sim_bench's per-case days), which get no flag.
+    """
+    ap.add_argument('--config', metavar='PATH', help='JSON or YAML settings file (see sim_config)')
+    for section, cls in SECTIONS.items():
+        group = ap.add_argument_group(f'{section} settings')
+        for f in fields(cls):
+            if f.name in exclude:
+                continue
+            base, optional, choices = field_type(cls, f.name)
+            if choices is not None:
+                choices = choices + ('none',) if optional else choices
+            group.add_argument('--' + f.name.replace('_', '-'), dest=f'cfg_{f.name}', choices=choices,
+                               metavar=None if choices else base.__name__.upper(),
+                               help='none to turn off' if optional else None)
+    ap.add_argument('--print-config', action='store_true', help='print the effective settings as JSON and exit')
+
+def config_from_args(args, module):
+    """Module defaults, then the --config file, then any setting flags."""
+    flags = {k[4:]: v for k, v in vars(args).items() if k.startswith('cfg_') and v is not None}
+    try:
+        config = SimConfig.from_module(module)
+        if args.config:
+            config = config.merge(read_config_file(args.config))
+        return config.override(flags)
+    except ValueError as e:
+        raise SystemExit(f'config: {e}')
+
+def configure(args, module):
+    """config_from_args(), --print-config, then apply() onto `module`; returns the SimConfig."""
+    config = config_from_args(args, module)
+    if args.print_config:
+        print(json.dumps(config.to_dict(), indent=2))
+        raise SystemExit
+    config.apply(module)
+    return config
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Order-book cost model for the Wick-Magic simulator.
+
+With SLIPPAGE_MODEL = 'book' a fill no longer pays the flat SLIPPAGE: it pays
+what walking the symbol's order book would have cost, relative to the mid.
+That includes the half-spread plus the impact of eating through the levels.
+A buy spends its USDT against the asks. A sell values its coins at the fill
+level and sells that notional into the bids. Both sides are read as a depth
+profile relative to the mid, so one snapshot stands in for the symbol's
+liquidity over the whole window.
+
+Books are padded to one (symbols, levels) array per side with cumulative
+quote and base columns. A fill is then a handful of array ops over
+(positions, levels) for all positions at once. An order larger than the book
+fills the remainder at the deepest level; `beyond_depth` counts those fills.
+Symbols without a snapshot keep the flat SLIPPAGE.
+
+Snapshots come from the source (fetch_order_book: a replay directory's
+orderbook/ files, or the exchange) and live exchange ones are kept under
+BOOK_CACHE_DIR for BOOK_MAX_AGE seconds:
+
+  order_books/<exchange>/<BASE_QUOTE>.json
+"""
+import os
+import json
+import time
+import numpy as np
+
+from sim_data import symbol_key
+
+SLIPPAGE_MODELS = ('flat', 'book')
+BOOK_LEVELS = 50  # levels per side requested from the exchange
+BOOK_CACHE_DIR = 'order_books'
+BOOK_MAX_AGE = 24*60*60  # seconds before a cached live snapshot is fetched again
+
+
+def book_cache_path(exchange_id, symbol):
+    return os.path.join(BOOK_CACHE_DIR, exchange_id, symbol_key(symbol) + '.json')
+
+def fetch_order_books(ex, symbols, limit=BOOK_LEVELS):
+    """{symbol: book} for the symbols that have one; live books go through the on-disk cache."""
+    use_cache = BOOK_CACHE_DIR is not None and getattr(ex, 'cacheable', True)
+    ex_id = getattr(ex, 'id', type(ex).__name__)
+    books = {}
+    for s in symbols:
+        path = book_cache_path(ex_id, s)
+        if use_cache and os.path.exists(path) and time.time() - os.path.getmtime(path) < BOOK_MAX_AGE:
+            with open(path) as f:
+                books[s] = json.load(f)
+            continue
+        try:
+            book = ex.fetch_order_book(s, limit)
+        except Exception as e:
+            print('order book error', s, e)
+            continue
+        books[s] = {k: book.get(k) for k in ('timestamp', 'bids', 'asks')}
+        if use_cache:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(books[s], f)
+            os.replace(path + '.tmp', path)
+    return books
+
+def depth_arrays(sides, n_levels):
+    """(price, cum quote, cum base) of shape (symbols, n_levels + 1) from per-symbol [[price, amount], ...].
+
+    Each row ends with a level at its deepest price and infinite size, so any
+    order completes somewhere in the row.
+    """
+    S = len(sides)
+    price = np.full((S, n_levels + 1), np.nan)
+    amount = np.zeros((S, n_levels + 1))
+    for j, levels in enumerate(sides):
+        if not levels:
+            continue
+        lv = np.asarray([l[:2] for l in levels], dtype=float)
+        price[j, :len(lv)] = lv[:, 0]
+        price[j, len(lv):] = lv[-1, 0]
+        amount[j, :len(lv)] = lv[:, 1]
+        amount[j, len(lv):] = np.inf
+    with np.errstate(invalid='ignore'):
+        cum_quote = np.cumsum(price * amount, axis=1)
+        cum_base = np.cumsum(amount, axis=1)
+    return price, cum_quote, cum_base
+
+
+class BookCosts:
+    """Per-symbol spread and depth, indexed by grid column."""
+
+    def __init__(self, symbols, books):
+        bids = [(books.get(s) or {}).get('bids') or [] for s in symbols]
+        asks = [(books.get(s) or {}).get('asks') or [] for s in symbols]
+        n = max([len(b) for b in bids + asks] + [1])
+        self.n_bids = np.array([len(b) for b in bids])
+        self.n_asks = np.array([len(a) for a in asks])
+        self.bid = depth_arrays(bids, n)
+        self.ask = depth_arrays(asks, n)
+        self.has_book = (self.n_bids > 0) & (self.n_asks > 0)
+        self.mid = np.where(self.has_book, (self.bid[0][:, 0] + self.ask[0][:, 0]) / 2, np.nan)
+        self.beyond_depth = 0
+
+    def select(self, cols):
+        """BookCosts for a column subset (e.g. a subset_grid), renumbered 0..len(cols)-1."""
+        out = BookCosts.__new__(BookCosts)
+        cols = np.asarray(cols, dtype=np.intp)
+        out.n_bids, out.n_asks = self.n_bids[cols], self.n_asks[cols]
+        out.bid = tuple(a[cols] for a in self.bid)
+        out.ask = tuple(a[cols] for a in self.ask)
+        out.has_book, out.mid = self.has_book[cols], self.mid[cols]
+        out.beyond_depth = 0
+        return out
+
+    def spread(self):
+        # relative bid/ask spread per symbol; NaN without a book
+        return np.where(self.has_book, (self.ask[0][:, 0] - self.bid[0][:, 0]) / self.mid, np.nan)
+
+    def buy_impact(self, cols, usdt):
+        """Average price over mid, minus 1, for spending `usdt` on each symbol's asks."""
+        price, cum_q, cum_b = (a[cols] for a in self.ask)
+        k = (cum_q < usdt[:, None]).sum(axis=1)
+        self.beyond_depth += int((k >= self.n_asks[cols]).sum())
+        r = np.arange(len(cols))
+        prev_q = np.where(k > 0, cum_q[r, k - 1], 0.0)
+        prev_b = np.where(k > 0, cum_b[r, k - 1], 0.0)
+        base = prev_b + (usdt - prev_q) / price[r, k]
+        return usdt / base / self.mid[cols] - 1
+
+    def sell_impact(self, cols, usdt):
+        """1 minus average price over mid for selling `usdt` (valued at mid) into each symbol's bids."""
+        price, cum_q, cum_b = (a[cols] for a in self.bid)
+        base = usdt / self.mid[cols]
+        k = (cum_b < base[:, None]).sum(axis=1)
+        self.beyond_depth += int((k >= self.n_bids[cols]).sum())
+        r = np.arange(len(cols))
+        prev_q = np.where(k > 0, cum_q[r, k - 1], 0.0)
+        prev_b = np.where(k > 0, cum_b[r, k - 1], 0.0)
+        proceeds = prev_q + (base - prev_b) * price[r, k]
+        return 1 - proceeds / base / self.mid[cols]
+
+    def buy_price(self, cols, price, usdt, slippage):
+        """Fill price of buying `usdt` at reference `price`, per position; flat `slippage` without a book."""
+        cols = np.asarray(cols, dtype=np.intp)
+        ok = self.has_book[cols]
+        out = price * (1 + slippage)
+        if ok.any():
+            out[ok] = price[ok] * (1 + self.buy_impact(cols[ok], np.broadcast_to(usdt, cols.shape)[ok]))
+        return out
+
+    def sell_price(self, cols, price, qty, slippage):
+        """Fill price of selling `qty` at reference `price`, per position; flat `slippage` without a book."""
+        cols = np.asarray(cols, dtype=np.intp)
+        ok = self.has_book[cols]
+        out = price * (1 - slippage)
+        if ok.any():
+            out[ok] = price[ok] * (1 - self.sell_impact(cols[ok], (qty * price)[ok]))
+        return out
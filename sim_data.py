@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Market data sources for the Wick-Magic simulator.
+
+A source is anything with the small slice of the ccxt exchange API the
+simulator uses: id, load_markets(), fetch_tickers(), fetch_ohlcv(),
+fetch_ohlcv_many(), fetch_order_book(), parse_timeframe() and milliseconds(). CcxtSource forwards
+to a live exchange (paging through `since`, batches fetched concurrently with
+ccxt.async_support under a token bucket), ReplaySource serves a recorded snapshot from local files (no network, fixed
+clock), and RecordingSource wraps another source and writes what it serves
+into a replay directory.
+
+Replay directory layout:
+  snapshot.json               {"timestamp": ms, "markets": {...}, "tickers": {...}}
+  ohlcv/<BASE_QUOTE>/<tf>.csv columns ts,open,high,low,close,volume (ts in epoch ms)
+  (or <tf>.parquet with the same columns)
+  orderbook/<BASE_QUOTE>.json {"timestamp": ms, "bids": [[price, amount], ...], "asks": [...]}
+"""
+import os
+import re
+import time
+import json
+import asyncio
+import pandas as pd
+import numpy as np
+
+OHLCV_COLS = ["ts", "open", "high", "low", "close", "volume"]
+TF_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+PAGE_LIMIT = 1000  # max candles per request on Bybit; larger limits get paged
+MAX_CONCURRENCY = 8
+
+def symbol_key(symbol):
+    # filesystem-safe symbol, e.g. BTC/USDT -> BTC_USDT
+    return symbol.replace('/', '_').replace(':', '_')
+
+def ts_to_ms(ts):
+    # int64 epoch ms from a tz-aware ts column, whatever its datetime unit; .values is the
+    # UTC datetime64 array underneath, so this is a cast, not per-element Timestamp arithmetic
+    return np.asarray(ts.values).astype('datetime64[ms]').view(np.int64)
+
+def parse_timeframe(timeframe):
+    # '15m' -> 900 seconds
+    m = re.fullmatch(r'(\d+)([mhdw])', timeframe)
+    if not m:
+        raise ValueError(f'unsupported timeframe {timeframe!r}')
+    return int(m.group(1)) * TF_UNITS[m.group(2)]
+
+def slice_window(rows, since, limit):
+    # what an exchange returns: `limit` bars from `since`, or the latest `limit` bars
+    if since is not None:
+        lo = int(np.searchsorted(rows[:, 0], since, side='left'))
+        return rows[lo:lo + limit] if limit else rows[lo:]
+    return rows[-limit:] if limit else rows
+
+def next_page(rows, since, limit, tf_ms, now):
+    # (since, limit) for the next request of a paged fetch, or None once done
+    if limit is not None and len(rows) >= limit:
+        return None
+    cursor = rows[-1][0] + tf_ms if rows else since
+    if cursor > now:
+        return None
+    return cursor, PAGE_LIMIT if limit is None else min(PAGE_LIMIT, limit - len(rows))
+
+def merge_page(rows, page, since):
+    # append the part of a page that is new: some exchanges hand back bars before `since`
+    start = rows[-1][0] if rows else since - 1
+    new = [r for r in page if r[0] > start]
+    rows.extend(new)
+    return len(new)
+
+
+class TokenBucket:
+    """Async token bucket: `rate` requests/second with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stamp = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DataSource:
+    """Interface the simulator reads market data through."""
+    id = 'source'
+    cacheable = True  # whether fetch_ohlcv_df may keep these candles in the on-disk store
+
+    def load_markets(self):
+        raise NotImplementedError
+
+    def fetch_tickers(self, symbols=None):
+        raise NotImplementedError
+
+    def fetch_ohlcv(self, symbol, timeframe='15m', since=None, limit=None):
+        """Rows of [ts_ms, open, high, low, close, volume], as a list or (N, 6) array."""
+        raise NotImplementedError
+
+    def fetch_order_book(self, symbol, limit=None):
+        """{'timestamp', 'bids', 'asks'}, best levels first, each level [price, amount]."""
+        raise NotImplementedError
+
+    def fetch_ohlcv_many(self, requests):
+        """fetch_ohlcv for each (symbol, timeframe, since, limit); failures come back as the Exception."""
+        out = []
+        for symbol, timeframe, since, limit in requests:
+            try:
+                out.append(self.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit))
+            except Exception as e:
+                out.append(e)
+        return out
+
+    def parse_timeframe(self, timeframe):
+        return parse_timeframe(timeframe)
+
+    def milliseconds(self):
+        return int(time.time()*1000)
+
+
+class CcxtSource(DataSource):
+    """Live exchange through ccxt (Bybit spot unless an exchange is given)."""
+
+    def __init__(self, exchange=None, max_concurrency=MAX_CONCURRENCY):
+        if exchange is None:
+            import ccxt
+            exchange = ccxt.bybit({'enableRateLimit': True, 'options': {'defaultType': 'spot'}})
+        self.exchange = exchange
+        self.id = exchange.id
+        self.max_concurrency = max_concurrency
+
+    def load_markets(self):
+        return self.exchange.load_markets()
+
+    def fetch_tickers(self, symbols=None):
+        return self.exchange.fetch_tickers(symbols)
+
+    def fetch_order_book(self, symbol, limit=None):
+        return self.exchange.fetch_order_book(symbol, limit)
+
+    def fetch_ohlcv(self, symbol, timeframe='15m', since=None, limit=None):
+        if since is None:
+            return self.exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+        # walk forward from `since` one page at a time until `limit` bars or the present
+        tf_ms = self.parse_timeframe(timeframe) * 1000
+        now = self.milliseconds()
+        rows = []
+        while (page := next_page(rows, since, limit, tf_ms, now)) is not None:
+            if not merge_page(rows, self.exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=page[0], limit=page[1]), since):
+                break
+        return rows[:limit] if limit else rows
+
+    def fetch_ohlcv_many(self, requests):
+        try:
+            asyncio.get_running_loop()
+            in_loop = True
+        except RuntimeError:
+            in_loop = False
+        if len(requests) < 2 or in_loop:
+            # nothing to overlap, or already inside an event loop: plain sequential fetches
+            return super().fetch_ohlcv_many(requests)
+        return asyncio.run(self._fetch_ohlcv_many(requests))
+
+    async def _fetch_ohlcv_many(self, requests):
+        import ccxt.async_support as ccxta
+        # the bucket does the throttling, so ccxt's own per-call limiter is off
+        ax = getattr(ccxta, self.id)({'enableRateLimit': False, 'options': dict(self.exchange.options or {})})
+        try:
+            if self.exchange.markets:
+                ax.set_markets(self.exchange.markets)
+            else:
+                await ax.load_markets()
+            bucket = TokenBucket(1000.0 / max(self.exchange.rateLimit, 1), self.max_concurrency)
+            sem = asyncio.Semaphore(self.max_concurrency)
+            now = self.milliseconds()
+            return await asyncio.gather(*(self._afetch_ohlcv(ax, bucket, sem, now, *r) for r in requests),
+                                        return_exceptions=True)
+        finally:
+            await ax.close()
+
+    async def _afetch_ohlcv(self, ax, bucket, sem, now, symbol, timeframe, since, limit):
+        async with sem:
+            if since is None:
+                await bucket.acquire()
+                return await ax.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+            tf_ms = self.parse_timeframe(timeframe) * 1000
+            rows = []
+            while (page := next_page(rows, since, limit, tf_ms, now)) is not None:
+                await bucket.acquire()
+                if not merge_page(rows, await ax.fetch_ohlcv(symbol, timeframe=timeframe, since=page[0], limit=page[1]), since):
+                    break
+            return rows[:limit] if limit else rows
+
+    def parse_timeframe(self, timeframe):
+        return self.exchange.parse_timeframe(timeframe)
+
+    def milliseconds(self):
+        return self.exchange.milliseconds()
+
+
+class ReplaySource(DataSource):
+    """Recorded snapshot + candle files; deterministic and offline."""
+    cacheable = False
+
+    def __init__(self, root):
+        self.root = root
+        self.id = 'replay'
+        with open(os.path.join(root, 'snapshot.json')) as f:
+            snap = json.load(f)
+        self.tickers = snap.get('tickers', {})
+        self.markets = snap.get('markets') or {s: {'symbol': s, 'spot': True} for s in self.tickers}
+        self.now = snap.get('timestamp')
+        self._candles = {}
+
+    def load_markets(self):
+        return self.markets
+
+    def fetch_tickers(self, symbols=None):
+        if symbols is None:
+            return dict(self.tickers)
+        return {s: self.tickers[s] for s in symbols if s in self.tickers}
+
+    def candle_path(self, symbol, timeframe):
+        base = os.path.join(self.root, 'ohlcv', symbol_key(symbol), timeframe)
+        for ext in ('.parquet', '.csv'):
+            if os.path.exists(base + ext):
+                return base + ext
+        return None
+
+    def load_candles(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        if key not in self._candles:
+            path = self.candle_path(symbol, timeframe)
+            if path is None:
+                raise LookupError(f'no replay candles for {symbol} {timeframe} in {self.root}')
+            df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path, float_precision='round_trip')
+            rows = df[OHLCV_COLS].to_numpy(dtype=float)
+            rows = rows[np.argsort(rows[:, 0], kind='stable')]
+            if self.now is not None:
+                rows = rows[rows[:, 0] <= self.now]
+            self._candles[key] = rows
+        return self._candles[key]
+
+    def fetch_ohlcv(self, symbol, timeframe='15m', since=None, limit=None):
+        return slice_window(self.load_candles(symbol, timeframe), since, limit)
+
+    def fetch_order_book(self, symbol, limit=None):
+        path = os.path.join(self.root, 'orderbook', symbol_key(symbol) + '.json')
+        if not os.path.exists(path):
+            raise LookupError(f'no replay order book for {symbol} in {self.root}')
+        with open(path) as f:
+            book = json.load(f)
+        return {**book, 'bids': book['bids'][:limit], 'asks': book['asks'][:limit]} if limit else book
+
+    def milliseconds(self):
+        return self.now if self.now is not None else super().milliseconds()
+
+
+class RecordingSource(DataSource):
+    """Pass-through wrapper that saves everything it serves as a replay directory."""
+
+    def __init__(self, source, root):
+        self.source = source
+        self.root = root
+        self.id = source.id
+        # bypass the candle store so full windows (not just missing tails) get recorded
+        self.cacheable = False
+        self.snapshot = {'timestamp': None, 'markets': {}, 'tickers': {}}
+
+    def _save_snapshot(self):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, 'snapshot.json'), 'w') as f:
+            json.dump(self.snapshot, f)
+
+    def load_markets(self):
+        markets = self.source.load_markets()
+        # keep only the fields the simulator looks at; full ccxt market dicts are large
+        self.snapshot['markets'] = {s: {'symbol': s, 'spot': bool(m.get('spot'))}
+                                    for s, m in markets.items() if isinstance(m, dict)}
+        self._save_snapshot()
+        return markets
+
+    def fetch_tickers(self, symbols=None):
+        tickers = self.source.fetch_tickers(symbols)
+        keep = ('symbol', 'bid', 'ask', 'last', 'high', 'low', 'quoteVolume', 'baseVolume')
+        self.snapshot['tickers'].update({s: {k: t.get(k) for k in keep} for s, t in tickers.items()})
+        self._save_snapshot()
+        return tickers
+
+    def fetch_ohlcv(self, symbol, timeframe='15m', since=None, limit=None):
+        data = self.source.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+        self._record(symbol, timeframe, data)
+        return data
+
+    def fetch_order_book(self, symbol, limit=None):
+        book = self.source.fetch_order_book(symbol, limit)
+        d = os.path.join(self.root, 'orderbook')
+        os.makedirs(d, exist_ok=True)
+        with open(os.path.join(d, symbol_key(symbol) + '.json'), 'w') as f:
+            json.dump({k: book.get(k) for k in ('timestamp', 'bids', 'asks')}, f)
+        return book
+
+    def fetch_ohlcv_many(self, requests):
+        results = self.source.fetch_ohlcv_many(requests)
+        for (symbol, timeframe, _, _), data in zip(requests, results):
+            if not isinstance(data, Exception):
+                self._record(symbol, timeframe, data)
+        return results
+
+    def _record(self, symbol, timeframe, data):
+        df = pd.DataFrame(np.asarray(data, dtype=float).reshape(-1, 6), columns=OHLCV_COLS)
+        df['ts'] = df['ts'].astype(np.int64)
+        d = os.path.join(self.root, 'ohlcv', symbol_key(symbol))
+        path = os.path.join(d, timeframe + '.csv')
+        os.makedirs(d, exist_ok=True)
+        if os.path.exists(path):
+            df = pd.concat([pd.read_csv(path, float_precision='round_trip'), df]).drop_duplicates('ts', keep='last').sort_values('ts')
+        df.to_csv(path, index=False)
+
+    def parse_timeframe(self, timeframe):
+        return self.source.parse_timeframe(timeframe)
+
+    def milliseconds(self):
+        now = self.source.milliseconds()
+        # the replay clock is the run's first reading, the one its window was measured from
+        if self.snapshot['timestamp'] is None:
+            self.snapshot['timestamp'] = now
+            self._save_snapshot()
+        return now
+
+
+def open_source(replay=None, record=None):
+    """CcxtSource by default, ReplaySource for --replay DIR; --record DIR tees into a replay dir."""
+    source = ReplaySource(replay) if replay else CcxtSource()
+    if record:
+        source = RecordingSource(source, record)
+    return source
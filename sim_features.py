@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Incremental rolling features for the Wick-Magic scorer.
+
+RollingFeatures keeps, for every symbol at once, the windowed sums, maxes and
+mins behind the candidate metrics (volume spike, wickiness, 24h range,
+impulse/retrace) and updates them in O(1) per closed 15m bar. The backtest
+feeds it the aligned grid bar by bar; a live 15m feed can call update() the
+same way as bars close.
+"""
+import numpy as np
+
+DAY_BARS = 96  # 15m bars per 24h
+
+
+class RollingSum:
+    """Sum of the last `window` values per symbol; O(1) per update."""
+
+    def __init__(self, n, window):
+        self.window = window
+        self.buf = np.zeros((n, window))
+        self.sum = np.zeros(n)
+        self.count = np.zeros(n, dtype=np.int64)
+
+    def update(self, x, idx):
+        # x: new values for the symbols in idx
+        pos = self.count[idx] % self.window
+        self.sum[idx] += x - self.buf[idx, pos]
+        self.buf[idx, pos] = x
+        self.count[idx] += 1
+
+
+class RollingMax:
+    """Max of the last `window` values per symbol; O(1) amortized per update.
+
+    Blocked prefix/suffix maxima (van Herk / Gil-Werman): the window is the
+    tail of the previous block (suffix max, computed once when that block
+    fills) plus the head of the current one (running prefix max).
+    """
+
+    def __init__(self, n, window):
+        self.window = window
+        self.buf = np.full((n, window), -np.inf)
+        self.prefix = np.full(n, -np.inf)
+        self.suffix = np.full((n, window + 1), -np.inf)  # [window] stays -inf
+        self.count = np.zeros(n, dtype=np.int64)
+        self.rows = np.arange(n)
+
+    def update(self, x, idx):
+        x = np.where(np.isnan(x), -np.inf, x)
+        pos = self.count[idx] % self.window
+        self.buf[idx, pos] = x
+        self.prefix[idx] = np.where(pos == 0, x, np.maximum(self.prefix[idx], x))
+        self.count[idx] += 1
+        done = idx[pos == self.window - 1]
+        if len(done):
+            self.suffix[done, :self.window] = np.maximum.accumulate(self.buf[done, ::-1], axis=1)[:, ::-1]
+
+    def value(self):
+        pos = (self.count - 1) % self.window
+        out = np.maximum(self.prefix, self.suffix[self.rows, pos + 1])
+        out[~np.isfinite(out)] = np.nan
+        return out
+
+
+class RollingMin(RollingMax):
+    def update(self, x, idx):
+        super().update(-x, idx)
+
+    def value(self):
+        return -super().value()
+
+
+class RollingFeatures:
+    """Candidate metrics over the most recent bars of every symbol.
+
+    vol_spike: last 24h volume / mean of the 7 preceding 24h volumes
+    wick:      mean (upper + lower wick) / range over the last 24h
+    rng24:     (max high - min low) / min low over the last 24h
+    pump/retr: impulse and retrace over the last `impulse_days`, from the
+               15m highs/lows instead of a separate 1d fetch
+    """
+
+    def __init__(self, n_symbols, day_bars=DAY_BARS, spike_days=7, impulse_days=35, min_impulse_days=10):
+        n, d = n_symbols, day_bars
+        self.n = n
+        self.spike_days = spike_days
+        self.spike_bars = d * (spike_days + 1)
+        self.min_impulse_bars = d * min_impulse_days
+        self.vol_day = RollingSum(n, d)
+        self.vol_spike_win = RollingSum(n, self.spike_bars)
+        self.wick_sum = RollingSum(n, d)
+        self.wick_cnt = RollingSum(n, d)
+        self.hi_day = RollingMax(n, d)
+        self.lo_day = RollingMin(n, d)
+        self.hi_imp = RollingMax(n, d * impulse_days)
+        self.lo_imp = RollingMin(n, d * impulse_days)
+        self.last_close = np.full(n, np.nan)
+        self.bars = np.zeros(n, dtype=np.int64)
+
+    def update(self, o, h, l, c, v, mask=None):
+        """Push one closed bar per symbol; `mask` marks which symbols have a bar this step."""
+        idx = np.arange(self.n) if mask is None else np.flatnonzero(mask)
+        if not len(idx):
+            return
+        o, h, l, c, v = (np.asarray(a, dtype=float)[idx] for a in (o, h, l, c, v))
+        upper = h - np.maximum(o, c)
+        lower = np.minimum(o, c) - l
+        ratio = (upper + lower) / np.maximum(h - l, 1e-12)
+        ok = ~np.isnan(ratio)
+        self.vol_day.update(np.nan_to_num(v), idx)
+        self.vol_spike_win.update(np.nan_to_num(v), idx)
+        self.wick_sum.update(np.where(ok, ratio, 0.0), idx)
+        self.wick_cnt.update(ok.astype(float), idx)
+        self.hi_day.update(h, idx)
+        self.lo_day.update(l, idx)
+        self.hi_imp.update(h, idx)
+        self.lo_imp.update(l, idx)
+        self.last_close[idx] = c
+        self.bars[idx] += 1
+
+    def features(self):
+        """Current metrics as arrays over symbols (NaN where history is too short)."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            last24 = self.vol_day.sum
+            avg24 = (self.vol_spike_win.sum - last24) / self.spike_days
+            vol_spike = np.where((self.bars >= self.spike_bars) & (avg24 > 0), last24 / avg24, np.nan)
+            cnt = self.wick_cnt.sum
+            wick = np.where(cnt > 0.5, self.wick_sum.sum / cnt, np.nan)
+            hi, lo = self.hi_day.value(), self.lo_day.value()
+            rng24 = np.where(lo > 0, (hi - lo) / lo, np.nan)
+            hi, lo = self.hi_imp.value(), self.lo_imp.value()
+            ok = (self.bars >= self.min_impulse_bars) & (lo > 0) & (hi > lo)
+            pump = np.where(ok, (hi - lo) / lo, np.nan)
+            retr = np.where(ok, (hi - self.last_close) / (hi - lo), np.nan)
+        return {'retr': retr, 'vol_spike': vol_spike, 'wick': wick, 'rng24': rng24, 'pump': pump}
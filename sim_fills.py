@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Intrabar fill model for the Wick-Magic simulator.
+
+A 15m candle only says that high and low were both reached, not in which
+order, so a bar that touches both the target and the stop needs an
+assumption about the path price took inside it. FillModel resolves target/stop
+exits for every open position in a bar at once, under one of:
+
+  optimistic  target wins whenever both are touched (the original behaviour)
+  ohlc        open -> high -> low -> close
+  olhc        open -> low -> high -> close
+  worst       stop wins whenever both are touched
+  subbar      replay the 1m candles inside the bar; falls back to worst
+              where 1m data is missing or both levels sit in one 1m candle
+
+Exits fill at the target/stop level itself, as before; the path only decides
+which level is reached first. What a fill pays on top of that level (flat
+SLIPPAGE, or spread and depth from sim_costs) is the `costs` part.
+"""
+import numpy as np
+
+from sim_data import ts_to_ms
+
+FILL_PATHS = ('optimistic', 'ohlc', 'olhc', 'worst', 'subbar')
+SYM_SHIFT = 1 << 42  # col * SYM_SHIFT + ts_ms stays sorted and unique per (symbol, ts)
+
+
+class SubBars:
+    """Lower-timeframe candles for the grid symbols, flattened for vectorized lookup."""
+
+    def __init__(self, symbols, frames, sub_ms=60*1000):
+        # frames: {symbol: df with ts (epoch ms int64 or tz-aware datetime), high, low}
+        keys, highs, lows = [], [], []
+        for j, s in enumerate(symbols):
+            df = frames.get(s)
+            if df is None or not len(df):
+                continue
+            ts = df['ts']
+            ts = ts.to_numpy(dtype=np.int64) if ts.dtype.kind in 'iu' else ts_to_ms(ts)
+            keys.append(j * SYM_SHIFT + ts)
+            highs.append(df['high'].to_numpy(dtype=float))
+            lows.append(df['low'].to_numpy(dtype=float))
+        cat = lambda parts, dt: np.concatenate(parts) if parts else np.empty(0, dt)
+        self.key = cat(keys, np.int64)
+        order = np.argsort(self.key, kind='stable')
+        self.key = self.key[order]
+        self.high = cat(highs, float)[order]
+        self.low = cat(lows, float)[order]
+        self.sub_ms = sub_ms
+
+    def select(self, cols):
+        """SubBars for a column subset (e.g. a subset_grid), renumbered 0..len(cols)-1."""
+        out = SubBars.__new__(SubBars)
+        old = self.key // SYM_SHIFT
+        remap = np.full(int(old.max()) + 1 if len(old) else 0, -1, dtype=np.int64)
+        remap[[c for c in cols if c < len(remap)]] = np.flatnonzero(np.asarray(cols) < len(remap))
+        new = remap[old] if len(old) else old
+        keep = new >= 0
+        out.key = new[keep] * SYM_SHIFT + self.key[keep] % SYM_SHIFT
+        order = np.argsort(out.key, kind='stable')
+        out.key = out.key[order]
+        out.high = self.high[keep][order]
+        out.low = self.low[keep][order]
+        out.sub_ms = self.sub_ms
+        return out
+
+    def window(self, cols, bar_ts, bar_ms):
+        """(high, low, valid) arrays of shape (positions, sub-bars per bar)."""
+        n_sub = max(1, bar_ms // self.sub_ms)
+        if not len(self.key):
+            empty = np.zeros((len(cols), n_sub))
+            return empty, empty, empty.astype(bool)
+        start_key = cols.astype(np.int64) * SYM_SHIFT + bar_ts
+        start = np.searchsorted(self.key, start_key, side='left')
+        idx = start[:, None] + np.arange(n_sub)
+        inside = idx < len(self.key)
+        idx = np.where(inside, idx, 0)
+        inside &= self.key[idx] < (start_key + bar_ms)[:, None]
+        return self.high[idx], self.low[idx], inside
+
+
+class FillModel:
+    def __init__(self, path='worst', sub_bars=None, bar_ms=15*60*1000, costs=None):
+        if path not in FILL_PATHS:
+            raise ValueError(f'unknown fill path {path!r}; expected one of {", ".join(FILL_PATHS)}')
+        self.path = path
+        self.sub_bars = sub_bars
+        self.bar_ms = bar_ms
+        self.costs = costs  # a sim_costs.BookCosts prices fills off order-book depth; None = flat SLIPPAGE
+
+    def select(self, cols):
+        """FillModel for a column subset (e.g. a subset_grid)."""
+        return FillModel(self.path, self.sub_bars.select(cols) if self.sub_bars is not None else None, self.bar_ms,
+                         self.costs.select(cols) if self.costs is not None else None)
+
+    def exits(self, cols, bar_ts, opens, highs, lows, target, stop):
+        """Resolve one bar for many positions -> (exited, gain) boolean arrays.
+
+        All arguments are aligned per position: grid column, bar open time (ms),
+        the bar's open/high/low and the position's target/stop prices.
+        """
+        hit_t = highs >= target
+        hit_s = lows <= stop
+        both = hit_t & hit_s
+        if self.path == 'optimistic':
+            target_first = np.ones_like(both)
+        elif self.path == 'ohlc':
+            # up leg first, unless the bar already opened through the stop
+            target_first = ~(opens <= stop)
+        elif self.path == 'olhc':
+            # down leg first, unless the bar already opened through the target
+            target_first = opens >= target
+        else:
+            target_first = np.zeros_like(both)
+            if self.path == 'subbar' and self.sub_bars is not None and both.any():
+                k = np.flatnonzero(both)
+                target_first[k] = self.replay(cols[k], bar_ts[k], target[k], stop[k])
+        gain = hit_t & (~hit_s | target_first)
+        return hit_t | hit_s, gain
+
+    def replay(self, cols, bar_ts, target, stop):
+        # first sub-bar touching each level; ties (and no data) go to the stop
+        sh, sl, ok = self.sub_bars.window(cols, bar_ts, self.bar_ms)
+        t_hit = ok & (sh >= target[:, None])
+        s_hit = ok & (sl <= stop[:, None])
+        n = t_hit.shape[1]
+        first_t = np.where(t_hit.any(axis=1), t_hit.argmax(axis=1), n)
+        first_s = np.where(s_hit.any(axis=1), s_hit.argmax(axis=1), n)
+        return first_t < first_s
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped store for aligned (time, symbol) grids.
+
+align_ohlcv() output is written once as one .npy file per array (int64
+timeline and ts, float64 or float32 OHLCV, bool valid) plus grid.json with
+the symbols. Every process that needs the same grid maps the files read-only
+instead of building its own copy, so the OS page cache holds one copy no
+matter how many simulations, sweep workers or walk-forward workers use it.
+
+Grids are keyed by the data they were built from (source, resolution, dtype
+and each symbol's first/last candle time, candle count and last candle), so
+concurrent runs over the same candles land on the same directory:
+
+  grid_store/<key>/grid.json
+  grid_store/<key>/timeline.npy, open.npy, ..., last_close.npy
+
+Directories are written under a temp name and renamed into place; when two
+processes build the same grid at once, the first rename wins and the other
+maps that one. The store is a cache and can be deleted at any time.
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+
+GRID_ARRAYS = ('timeline', 'open', 'high', 'low', 'close', 'volume', 'ts', 'valid', 'last_close')
+PRICE_ARRAYS = ('open', 'high', 'low', 'close', 'volume', 'last_close')
+GRID_DTYPES = ('float64', 'float32')
+
+
+def grid_key(source_id, resolution, dtype, series):
+    """Key for a grid from `series`: {symbol: (candles, first ts, last ts, last candle's values)}, in symbol order."""
+    h = hashlib.blake2b(digest_size=12)
+    h.update(json.dumps([source_id, resolution, dtype]).encode())
+    for s, (n, first, last, last_row) in series.items():
+        h.update(s.encode())
+        h.update(np.array([n, first, last], dtype=np.int64).tobytes())
+        # the last candle may still have been forming when it was fetched
+        h.update(np.asarray(last_row, dtype=float).tobytes())
+    return h.hexdigest()
+
+def save_grid(grid, path, dtype='float64'):
+    """Write `grid` to directory `path` (atomically); returns False if another process already had."""
+    if dtype not in GRID_DTYPES:
+        raise ValueError(f'unknown grid dtype {dtype!r}; expected one of {", ".join(GRID_DTYPES)}')
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=os.path.basename(path) + '.tmp', dir=parent)
+    try:
+        for k in GRID_ARRAYS:
+            arr = grid[k].astype(dtype) if k in PRICE_ARRAYS else grid[k]
+            np.save(os.path.join(tmp, k + '.npy'), np.ascontiguousarray(arr))
+        with open(os.path.join(tmp, 'grid.json'), 'w') as f:
+            json.dump({'symbols': list(grid['symbols']), 'dtype': dtype}, f)
+        os.rename(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if os.path.exists(os.path.join(path, 'grid.json')):
+            return False
+        raise
+    return True
+
+def load_grid(path):
+    """Grid dict over read-only memory maps of a stored grid; None if `path` holds none."""
+    try:
+        with open(os.path.join(path, 'grid.json')) as f:
+            meta = json.load(f)
+        # plain ndarray views of the maps: np.memmap's per-slice overhead adds up in the bar loop
+        grid = {k: np.asarray(np.load(os.path.join(path, k + '.npy'), mmap_mode='r')) for k in GRID_ARRAYS}
+    except (OSError, ValueError):
+        return None
+    symbols = meta['symbols']
+    grid.update(symbols=symbols, sym_index={s: j for j, s in enumerate(symbols)}, store=path)
+    return grid
+
+def stored_grid(root, key, build, dtype='float64'):
+    """The grid under root/key, building and saving it with build() first if it is not there yet."""
+    path = os.path.join(root, key)
+    grid = load_grid(path)
+    if grid is None:
+        save_grid(build(), path, dtype)
+        grid = load_grid(path)
+    return grid
+
+def temp_store():
+    # RAM-backed where there is one, so a throwaway store never touches the disk
+    return tempfile.mkdtemp(prefix='sim_grid_', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo robustness check for a finished Wick-Magic simulator run.
+Resamples what the run produced, thousands of times, to see how much of the
+single-path return_pct is luck of ordering:
+
+  trades  closed-trade pnl (SELL rows of trade_log), realized equity only
+  bars    per-bar equity returns (equity_curve), marks open positions too
+
+Draws are i.i.d. (--block 1) or a circular block bootstrap (--block N keeps
+runs of N consecutive outcomes together, preserving streaks/volatility
+clustering). All paths of a chunk are built as one (paths x steps) array, so
+there is no Python loop per path. Output: montecarlo.json with return and
+max-drawdown percentiles per mode.
+
+  python sim_montecarlo.py --paths 10000
+  python sim_montecarlo.py --paths 20000 --trade-block 5 --bar-block 96 --seed 1
+"""
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+from sim_output import read_output
+
+PATHS = 10000
+CHUNK_CELLS = 8_000_000  # paths x steps per vectorized chunk (~64MB of float64)
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+def bootstrap_index(rng, n_paths, n, block=1):
+    """(n_paths, n) indices into a length-n sample; circular blocks of `block`."""
+    if block <= 1:
+        return rng.integers(0, n, size=(n_paths, n))
+    n_blocks = -(-n // block)
+    starts = rng.integers(0, n, size=(n_paths, n_blocks, 1))
+    return ((starts + np.arange(block)) % n).reshape(n_paths, -1)[:, :n]
+
+def max_drawdown(equity):
+    """Largest peak-to-trough fall per row of an (paths, steps) equity array, as a fraction."""
+    peak = np.maximum.accumulate(equity, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dd = np.where(peak > 0, 1 - equity / peak, 1.0)
+    return dd.max(axis=1)
+
+def simulate_paths(sample, start, n_paths, block=1, kind='pnl', seed=0):
+    """Resample `sample` into n_paths paths -> (return fraction, max drawdown fraction) arrays.
+
+    kind='pnl': additive USDT amounts on top of `start`; kind='returns':
+    compounding per-step returns. The equity array includes the start value,
+    so a path that only falls still shows its drawdown.
+    """
+    sample = np.asarray(sample, dtype=float)
+    rng = np.random.default_rng(seed)
+    rets = np.empty(n_paths)
+    dds = np.empty(n_paths)
+    if not len(sample):
+        rets[:] = 0.0
+        dds[:] = 0.0
+        return rets, dds
+    chunk = max(1, CHUNK_CELLS // len(sample))
+    for a in range(0, n_paths, chunk):
+        b = min(n_paths, a + chunk)
+        draws = sample[bootstrap_index(rng, b - a, len(sample), block)]
+        if kind == 'pnl':
+            equity = start + np.cumsum(draws, axis=1)
+        else:
+            equity = start * np.cumprod(1 + draws, axis=1)
+        equity = np.concatenate([np.full((b - a, 1), start), equity], axis=1)
+        rets[a:b] = equity[:, -1] / start - 1
+        dds[a:b] = max_drawdown(equity)
+    return rets, dds
+
+def distribution(x):
+    x = np.asarray(x) * 100
+    return {
+        'mean': float(x.mean()), 'std': float(x.std()),
+        **{f'p{q}': float(v) for q, v in zip(PERCENTILES, np.percentile(x, PERCENTILES))},
+    }
+
+def summarize(rets, dds, observed_ret, observed_dd):
+    return {
+        'observed_return_pct': observed_ret * 100,
+        'observed_max_drawdown_pct': observed_dd * 100,
+        'return_pct': distribution(rets),
+        'max_drawdown_pct': distribution(dds),
+        'prob_loss': float((rets < 0).mean()),
+        # share of paths doing at least as well as the run itself
+        'prob_beat_observed': float((rets >= observed_ret).mean()),
+    }
+
+def run(trade_log, equity_curve, start, n_paths=PATHS, trade_block=1, bar_block=1, seed=0):
+    report = {'paths': n_paths, 'seed': seed, 'start': start}
+    if trade_log is not None:
+        sells = trade_log[trade_log['side'] == 'SELL']
+        pnl = sells['pnl'].to_numpy(dtype=float)
+        equity = start + np.r_[0.0, np.cumsum(pnl)]
+        rets, dds = simulate_paths(pnl, start, n_paths, trade_block, 'pnl', seed)
+        report['trades'] = {'n': int(len(pnl)), 'block': trade_block,
+                            **summarize(rets, dds, equity[-1] / start - 1, max_drawdown(equity[None])[0])}
+    if equity_curve is not None:
+        eq = np.r_[start, equity_curve['equity'].to_numpy(dtype=float)]
+        bar_rets = eq[1:] / eq[:-1] - 1
+        rets, dds = simulate_paths(bar_rets, start, n_paths, bar_block, 'returns', seed + 1)
+        report['bars'] = {'n': int(len(bar_rets)), 'block': bar_block,
+                          **summarize(rets, dds, eq[-1] / start - 1, max_drawdown(eq[None])[0])}
+    return report
+
+def main():
+    import sim_wickgun_sim as sim  # CLI defaults only, as in sim_analytics
+    ap = argparse.ArgumentParser(description='Bootstrap the trades and bar returns of a simulator run')
+    ap.add_argument('--trade-log', default=f'trade_log.{sim.OUTPUT_FORMAT}')
+    ap.add_argument('--equity', default=f'equity_curve.{sim.OUTPUT_FORMAT}')
+    ap.add_argument('--start', type=float, default=None, help='starting USDT (default: summary.json, else START_USDT)')
+    ap.add_argument('--paths', type=int, default=PATHS)
+    ap.add_argument('--trade-block', type=int, default=1, help='block length for trade resampling (1 = i.i.d.)')
+    ap.add_argument('--bar-block', type=int, default=1, help='block length for bar-return resampling (1 = i.i.d.)')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--out', default='montecarlo.json')
+    args = ap.parse_args()
+
+    start = args.start
+    if start is None:
+        start = sim.START_USDT
+        if os.path.exists('summary.json'):
+            with open('summary.json') as f:
+                start = json.load(f).get('start', start)
+    trade_log = read_output(args.trade_log) if os.path.exists(args.trade_log) else None
+    equity_curve = read_output(args.equity) if os.path.exists(args.equity) else None
+    if trade_log is None and equity_curve is None:
+        raise SystemExit(f'neither {args.trade_log} nor {args.equity} found; run the simulator first')
+    t0 = time.time()
+    report = run(trade_log, equity_curve, start, args.paths, args.trade_block, args.bar_block, args.seed)
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    for mode in ('trades', 'bars'):
+        if mode in report:
+            r = report[mode]
+            ret, dd = r['return_pct'], r['max_drawdown_pct']
+            print(f"{mode:>6} (n={r['n']}): return p5/p50/p95 {ret['p5']:.2f}/{ret['p50']:.2f}/{ret['p95']:.2f}%  "
+                  f"max DD p50/p95 {dd['p50']:.2f}/{dd['p95']:.2f}%  P(loss) {r['prob_loss']:.3f}")
+    print(f'{args.paths} paths in {time.time() - t0:.2f}s. Wrote {args.out}')
+
+if __name__ == '__main__':
+    main()
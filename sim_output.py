@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Streaming output for long simulator runs.
+
+ChunkedWriter buffers rows and flushes them every `chunk_rows`, so a run
+never holds its whole trade log or equity curve in memory and a partial run
+can be inspected while it is still going:
+
+  *.csv      one file, appended chunk by chunk (header written once)
+  *.parquet  a directory of part-NNNNN.parquet files, each complete on its
+             own; pd.read_parquet(dir) reads whatever has been flushed so far
+             (needs pyarrow)
+
+checkpoint() flushes and returns the writer's position; a writer created
+with resume=<that position> cuts the output back to it and appends from there,
+so a resumed run (see sim_checkpoint) drops whatever a killed run wrote after
+its last checkpoint.
+"""
+import os
+import time
+import shutil
+from collections import Counter
+import pandas as pd
+
+CHUNK_ROWS = 10000
+OUTPUT_FORMATS = ('csv', 'parquet')
+
+TRADE_COLS = ['symbol', 'side', 'ts', 'price', 'usdt', 'qty', 'pnl', 'reason']
+TRADE_DTYPES = {'ts': 'int64', 'price': 'float64', 'usdt': 'float64', 'qty': 'float64', 'pnl': 'float64'}
+EQUITY_COLS = ['ts', 'cash', 'invested', 'equity', 'positions']
+EQUITY_DTYPES = {'ts': 'int64', 'cash': 'float64', 'invested': 'float64', 'equity': 'float64', 'positions': 'int64'}
+
+
+class ChunkedWriter:
+    """Buffered row writer; rows are dicts, missing keys are written empty."""
+
+    def __init__(self, path, columns, dtypes=None, chunk_rows=CHUNK_ROWS, count_by=None, resume=None):
+        self.path = path
+        self.columns = columns
+        self.dtypes = dtypes or {}
+        self.chunk_rows = chunk_rows
+        self.count_by = count_by
+        self.counts = Counter()  # rows per value of the count_by column
+        self.rows_written = 0
+        self.parts = 0
+        self.write_sec = 0.0  # time spent in flush (DataFrame build + file write)
+        self.buf = []
+        self.parquet = path.endswith('.parquet')
+        if resume is not None:
+            self.restore(resume)
+            return
+        # a rerun replaces the previous output instead of appending to it
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+        if self.parquet:
+            os.makedirs(path)
+
+    def append(self, row):
+        self.buf.append(row)
+        if self.count_by is not None:
+            self.counts[row.get(self.count_by)] += 1
+        if len(self.buf) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self, final=False):
+        # an empty csv still gets its header, once; an empty parquet output one zero-row part on close,
+        # so either reads back with its columns
+        if not self.buf and (self.parts or (self.parquet and not final)):
+            return
+        t0 = time.perf_counter()
+        df = pd.DataFrame(self.buf, columns=self.columns).astype(self.dtypes)
+        if self.parquet:
+            df.to_parquet(os.path.join(self.path, f'part-{self.parts:05d}.parquet'), index=False)
+        else:
+            df.to_csv(self.path, mode='a', header=self.parts == 0, index=False)
+        self.write_sec += time.perf_counter() - t0
+        self.parts += 1
+        self.rows_written += len(self.buf)
+        self.buf = []
+
+    def checkpoint(self):
+        self.flush()
+        size = 0 if self.parquet or not os.path.exists(self.path) else os.path.getsize(self.path)
+        return {'rows_written': self.rows_written, 'parts': self.parts, 'size': size, 'counts': dict(self.counts)}
+
+    def restore(self, state):
+        self.rows_written, self.parts = state['rows_written'], state['parts']
+        self.counts = Counter(state.get('counts', {}))
+        if self.parquet:
+            os.makedirs(self.path, exist_ok=True)
+            for name in os.listdir(self.path):
+                if name.startswith('part-') and int(name[5:10]) >= self.parts:
+                    os.remove(os.path.join(self.path, name))
+        else:
+            with open(self.path, 'a') as f:
+                f.truncate(state['size'])
+
+    def close(self):
+        self.flush(final=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # flush on errors too, so a crashed run keeps everything up to the crash
+        self.close()
+        return False
+
+
+def read_output(path):
+    # csv file or a parquet part directory, as written above
+    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+
+def output_path(stem, fmt):
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f'unknown output format {fmt!r}; expected one of {", ".join(OUTPUT_FORMATS)}')
+    return f'{stem}.{fmt}'
+
+def trade_writer(fmt='csv', stem='trade_log', chunk_rows=CHUNK_ROWS, resume=None):
+    return ChunkedWriter(output_path(stem, fmt), TRADE_COLS, TRADE_DTYPES, chunk_rows, count_by='side', resume=resume)
+
+def equity_writer(fmt='csv', stem='equity_curve', chunk_rows=CHUNK_ROWS, resume=None):
+    return ChunkedWriter(output_path(stem, fmt), EQUITY_COLS, EQUITY_DTYPES, chunk_rows, resume=resume)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Paper trading for the Wick-Magic rotation strategy on a stream of closed bars.
+
+PaperTrader consumes one closed 15m bar per step for the whole universe,
+updates the rolling features incrementally, re-ranks the enabled symbols every
+RECALC_INTERVAL and trades through the same entry/exit code and FillModel as
+the backtest, so a feed replaying the backtest's candles reproduces its trades.
+Only bars that actually arrived are acted on (the backtest grid may also point
+a symbol with a gap at its next candle).
+
+A feed is any iterable of (ts_ms, open, high, low, close, volume, mask)
+tuples with one array entry per universe symbol; `mask` marks the symbols
+that have a bar at ts_ms. ReplayFeed plays a recorded replay directory (see
+sim_data) and stands in for the Bybit kline websocket, optionally paced in
+real time. Outputs: paper_trade_log.csv, paper_equity_curve.csv.
+
+  python sim_paper.py --replay replay_dir
+  python sim_paper.py --replay replay_dir --top-n 200 --interval 0.5
+"""
+import time
+import argparse
+import numpy as np
+
+import sim_wickgun_sim as sim
+from sim_data import open_source, parse_timeframe
+from sim_book import PositionBook
+from sim_features import RollingFeatures
+from sim_risk import RiskEngine
+from sim_output import trade_writer, equity_writer
+from sim_config import add_arguments, configure
+
+
+class ReplayFeed:
+    """Closed bars of a replay directory in time order, one step per bar timestamp."""
+
+    def __init__(self, source, symbols, interval=0.0):
+        self.symbols = list(symbols)
+        self.grid = sim.align_ohlcv(sim.fetch_universe_ohlcv(source, self.symbols))
+        self.symbols = self.grid['symbols']  # symbols whose candles loaded
+        self.interval = interval  # seconds between bars; 0 = as fast as possible
+
+    def __iter__(self):
+        g = self.grid
+        exact = g['valid'] & (g['ts'] == g['timeline'][:, None])
+        for i, ts in enumerate(g['timeline'].tolist()):
+            if self.interval and i:
+                time.sleep(self.interval)
+            yield ts, g['open'][i], g['high'][i], g['low'][i], g['close'][i], g['volume'][i], exact[i]
+
+
+class PaperTrader:
+    def __init__(self, symbols, params=None, fills=None, recalc_interval=sim.RECALC_INTERVAL,
+                 day_bars=None, trades=None, equity=None):
+        self.symbols = list(symbols)
+        self.p = params or sim.default_params()
+        self.weights = tuple(self.p[k] for k in sim.WEIGHT_NAMES)
+        self.fills = fills or sim.FillModel(sim.FILL_PATH)
+        self.recalc_ms = recalc_interval * 1000
+        n = len(self.symbols)
+        day_bars = day_bars or 86400 // parse_timeframe(sim.RESOLUTION)
+        self.features = RollingFeatures(n, day_bars=day_bars)
+        self.book = PositionBook(n)
+        self.risk = RiskEngine.from_params(n, self.p, day_bars)
+        self.cash = self.p['START_USDT']
+        self.mark = np.full(n, np.nan)
+        self.enabled = np.empty(0, dtype=np.intp)
+        self.last_recalc = None
+        self.trades = [] if trades is None else trades
+        self.equity = equity
+        self.latency = []  # seconds from bar arrival to decisions done, per bar
+
+    def rotate(self):
+        # rank on the features of the bars closed so far
+        scores = sim.score_matrix(*(self.features.features()[k] for k in sim.SCORE_INPUTS), weights=self.weights)
+        self.enabled = np.argsort(-scores, kind='stable')[:self.p['MAX_PAIRS']]
+        if self.risk is not None:
+            self.risk.rotate(self.enabled, self.book)
+
+    def on_bar(self, ts, o, h, l, c, v, mask):
+        t0 = time.perf_counter()
+        if self.last_recalc is None or ts - self.last_recalc >= self.recalc_ms:
+            self.rotate()
+            self.last_recalc = ts
+        bar = {'ts': np.full(len(self.symbols), ts, dtype=np.int64), 'valid': mask, 'open': o, 'high': h, 'low': l}
+        self.cash = sim.enter_positions(self.book, self.enabled, bar, self.cash, self.p, self.trades, self.symbols, self.risk,
+                                       self.fills.costs)
+        self.cash = sim.exit_positions(self.book, bar, self.cash, self.p, self.fills, self.trades, self.symbols)
+        self.features.update(o, h, l, c, v, mask)
+        if self.risk is not None:
+            self.risk.update(c, mask)
+        self.mark[mask] = c[mask]
+        if self.equity is not None:
+            invested = self.book.value(self.mark, fallback=self.book.entry_price)
+            self.equity.append({'ts': ts, 'cash': self.cash, 'invested': invested,
+                                'equity': self.cash + invested, 'positions': len(self.book)})
+        self.latency.append(time.perf_counter() - t0)
+
+    def run(self, feed):
+        for bar in feed:
+            self.on_bar(*bar)
+        return self
+
+    def value(self):
+        return self.cash + self.book.value(self.mark, fallback=self.book.entry_price)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Paper-trade the Wick-Magic rotation on a replayed bar feed')
+    ap.add_argument('--replay', metavar='DIR', required=True, help='recorded replay directory to stream')
+    ap.add_argument('--interval', type=float, default=0.0, help='seconds between bars (0 = no pacing)')
+    add_arguments(ap)
+    args = ap.parse_args()
+    configure(args, sim)
+
+    ex = open_source(args.replay)
+    top, _ = sim.load_universe(ex, sim.TOP_N)
+    feed = ReplayFeed(ex, top, args.interval)
+    fills = sim.make_fill_model(ex, feed.symbols)
+    p = sim.default_params()
+    with trade_writer(sim.OUTPUT_FORMAT, 'paper_trade_log') as tw, \
+            equity_writer(sim.OUTPUT_FORMAT, 'paper_equity_curve') as ew:
+        trader = PaperTrader(feed.symbols, p, fills, trades=tw, equity=ew).run(feed)
+    lat = np.array(trader.latency) * 1000
+    end = trader.value()
+    print(f"Bars: {len(lat)}  Trades: {tw.counts['SELL']}  End: {end:.2f} ({(end / p['START_USDT'] - 1) * 100:.2f}%)")
+    if len(lat):
+        print(f'Bar-to-decision latency ms: p50 {np.percentile(lat, 50):.3f}  p99 {np.percentile(lat, 99):.3f}  max {lat.max():.3f}')
+
+if __name__ == '__main__':
+    main()
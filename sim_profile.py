@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Stage timing and profiling for the Wick-Magic simulator.
+
+simulate() runs every stage (markets, tickers, candles, features, scoring,
+loop, output) inside a Profiler, which records wall seconds per stage and a
+Counter of work done per stage (bars, grid cells scanned, fills, rows
+written, candle-store hits). The report lands in summary.json under 'profile'.
+
+For a function-level view, profiled() wraps a whole run in cProfile (stats
+dump + top functions printed) or pyinstrument (html; needs pyinstrument):
+
+  python sim_wickgun_sim.py --replay replay_dir --profile cprofile
+  python sim_wickgun_sim.py --replay replay_dir --profile pyinstrument --profile-out run.html
+  python -m pstats sim_profile.prof
+"""
+import time
+import pstats
+import cProfile
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_PATHS = {'cprofile': 'sim_profile.prof', 'pyinstrument': 'sim_profile.html'}
+TOP_FUNCTIONS = 25
+
+
+class Profiler:
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        # re-entering a stage adds to its time
+        t0 = time.perf_counter()
+        try:
+            yield self.stats(name)
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - t0
+
+    def stats(self, name):
+        """The stage's Counter, for code that counts its own work (e.g. fetch_ohlcv_dfs stats=)."""
+        return self.counters.setdefault(name, Counter())
+
+    def report(self):
+        return {
+            'total_sec': round(sum(self.stages.values()), 4),
+            'stages_sec': {k: round(v, 4) for k, v in self.stages.items()},
+            'counters': {k: dict(c) for k, c in self.counters.items() if c},
+        }
+
+
+@contextmanager
+def profiled(kind=None, path=None):
+    """cProfile or pyinstrument around the block; no-op when `kind` is None."""
+    if kind is None:
+        yield
+        return
+    path = path or PROFILE_PATHS[kind]
+    if kind == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler as Sampler
+        except ImportError:
+            raise SystemExit('--profile pyinstrument needs the pyinstrument package (pip install pyinstrument)')
+        sampler = Sampler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            with open(path, 'w') as f:
+                f.write(sampler.output_html())
+            print('Wrote', path)
+        return
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        prof.dump_stats(path)
+        pstats.Stats(prof).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        print('Wrote', path)
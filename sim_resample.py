@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Multi-timeframe view of the base-resolution candles.
+
+Resampler derives 1h/4h/1d (any whole multiple of the base timeframe) bars
+from the 15m frames already fetched for the run and memoizes them per
+(symbol, timeframe), so one fetch feeds every timeframe the scoring needs
+instead of a separate network round trip per timeframe.
+
+Buckets are aligned to the UTC epoch like the exchange's own candles (1d
+starts at 00:00 UTC, 4h at 00/04/08...). The last bucket may be partial,
+which is also what a live fetch returns for the still-forming candle;
+get(..., complete=True) drops it, for windows that must span whole buckets
+(e.g. "the last 24 hours" as 24 x 1h).
+"""
+import numpy as np
+import pandas as pd
+
+from sim_data import OHLCV_COLS, ts_to_ms, parse_timeframe
+
+# base resolutions the 1h/1d scoring bars can be derived from (whole divisors of 1h)
+BASE_TIMEFRAMES = ('1m', '3m', '5m', '15m', '30m', '1h')
+
+
+def resample_ohlcv(ts, vals, tf_ms):
+    """(int64 ts, [open, high, low, close, volume]) sorted by ts -> the same at tf_ms buckets."""
+    if not len(ts):
+        return ts[:0], vals[:0]
+    bucket = ts - ts % tf_ms
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+    out = np.column_stack([
+        vals[starts, 0],
+        np.fmax.reduceat(vals[:, 1], starts),  # fmax/fmin skip NaN like nanmax/nanmin
+        np.fmin.reduceat(vals[:, 2], starts),
+        vals[ends, 3],
+        np.add.reduceat(np.nan_to_num(vals[:, 4]), starts),
+    ])
+    return bucket[starts], out
+
+
+class Resampler:
+    """Higher-timeframe frames derived from base frames on demand, memoized."""
+
+    def __init__(self, frames, base_timeframe):
+        # frames: {symbol: df with OHLCV_COLS, ts tz-aware datetime}
+        self.frames = frames
+        self.base_timeframe = base_timeframe
+        self.base_ms = parse_timeframe(base_timeframe) * 1000
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbol, timeframe, complete=False):
+        """df of `timeframe` bars for `symbol`; KeyError if the symbol has no base frame.
+
+        With complete=True a last bucket that runs past the end of the base
+        candles (start + timeframe > last base bar's end) is left out.
+        """
+        out = self.resampled(symbol, timeframe)
+        if complete and timeframe != self.base_timeframe and len(out):
+            base_end = int(ts_to_ms(self.frames[symbol]['ts'].iloc[-1:])[0]) + self.base_ms
+            if int(ts_to_ms(out['ts'].iloc[-1:])[0]) + parse_timeframe(timeframe) * 1000 > base_end:
+                out = out.iloc[:-1]
+        return out
+
+    def resampled(self, symbol, timeframe):
+        if timeframe == self.base_timeframe:
+            return self.frames[symbol]
+        key = (symbol, timeframe)
+        if key in self.cache:
+            self.hits += 1
+            return self.cache[key]
+        self.misses += 1
+        tf_ms = parse_timeframe(timeframe) * 1000
+        if tf_ms % self.base_ms:
+            raise ValueError(f'{timeframe} is not a whole multiple of the base timeframe {self.base_timeframe}')
+        df = self.frames[symbol]
+        ts, vals = resample_ohlcv(ts_to_ms(df['ts']), df[OHLCV_COLS[1:]].to_numpy(dtype=float), tf_ms)
+        out = pd.DataFrame(vals, columns=OHLCV_COLS[1:])
+        out.insert(0, 'ts', pd.to_datetime(ts, unit='ms', utc=True))
+        self.cache[key] = out
+        return out
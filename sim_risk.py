@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Portfolio-level risk checks for the Wick-Magic rotation.
+
+RollingReturns keeps the last `window` bar log-returns of every symbol in one
+ring buffer (O(symbols) per bar). At each rotation RiskEngine builds the
+pairwise correlation matrix of just the enabled + held symbols from it, so
+the per-recalc cost grows with MAX_PAIRS, not with the universe, and every
+buy until the next rotation reads from that cached matrix.
+
+Before each buy, the order is blocked if it would break one of the caps,
+all fractions of current equity (cash + open positions at their last close):
+
+  MAX_WEIGHT         cost of one position
+  MAX_DEPLOYED       cost of all open positions
+  MAX_CORR_EXPOSURE  cost of the open positions correlated >= CORR_THRESHOLD
+                     with the symbol being bought, plus the new one
+
+A cap set to None is off, which is the engine default: a cap changes which
+buys happen, so it is opted into per run (config, sweep grid, CLI flag).
+"""
+import numpy as np
+
+CORR_DAYS = 7  # correlation lookback
+MIN_OVERLAP = 0.25  # pairs with fewer common bars than this share of the window count as uncorrelated
+
+
+class RollingReturns:
+    """Bar log-returns of the last `window` steps for all symbols, as a ring buffer."""
+
+    def __init__(self, n, window):
+        self.window = window
+        self.ret = np.zeros((window, n))
+        self.ok = np.zeros((window, n), dtype=bool)
+        self.last = np.full(n, np.nan)
+        self.count = 0
+
+    def update(self, close, mask):
+        close = np.asarray(close, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = np.log(close / self.last)
+        ok = mask & np.isfinite(r)
+        row = self.count % self.window
+        self.ret[row] = np.where(ok, r, 0.0)
+        self.ok[row] = ok
+        self.last[mask] = close[mask]
+        self.count += 1
+
+    def state(self):
+        return {'ret': self.ret, 'ok': self.ok, 'last': self.last, 'count': self.count}
+
+    def restore(self, state):
+        self.ret[:], self.ok[:], self.last[:] = state['ret'], state['ok'], state['last']
+        self.count = int(state['count'])
+
+    def corr(self, cols):
+        """Pairwise correlation over common bars for `cols` -> (k, k); NaN where overlap is too short."""
+        r, m = self.ret[:, cols], self.ok[:, cols].astype(float)
+        n = m.T @ m
+        sx = r.T @ m  # sx[i, j]: sum of r_i over bars where j also has a return
+        sxx = (r * r).T @ m
+        sxy = r.T @ r
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = n * sxx - sx * sx
+            out = (n * sxy - sx * sx.T) / np.sqrt(var * var.T)
+        out[n < max(2, MIN_OVERLAP * self.window)] = np.nan
+        return out
+
+
+class RiskEngine:
+    def __init__(self, n_symbols, params, day_bars):
+        self.max_weight = params.get('MAX_WEIGHT')
+        self.max_deployed = params.get('MAX_DEPLOYED')
+        self.max_corr = params.get('MAX_CORR_EXPOSURE')
+        self.corr_threshold = params.get('CORR_THRESHOLD')
+        self.returns = RollingReturns(n_symbols, CORR_DAYS * day_bars) if self.max_corr is not None else None
+        self.mark = np.full(n_symbols, np.nan)
+        self.pos = np.full(n_symbols, -1, dtype=np.intp)  # grid column -> row/col of the cached matrix
+        self.corr = None
+        self.blocked = {'weight': 0, 'deployed': 0, 'corr': 0}
+
+    @classmethod
+    def from_params(cls, n_symbols, params, day_bars):
+        # None when every cap is off, so the loop skips the risk stage entirely
+        if all(params.get(k) is None for k in ('MAX_WEIGHT', 'MAX_DEPLOYED', 'MAX_CORR_EXPOSURE')):
+            return None
+        return cls(n_symbols, params, day_bars)
+
+    def update(self, close, mask):
+        # after each bar: last closes for marking, and the new returns
+        self.mark[mask] = close[mask]
+        if self.returns is not None:
+            self.returns.update(close, mask)
+
+    def state(self):
+        return {'mark': self.mark, 'pos': self.pos, 'corr': self.corr, 'blocked': self.blocked,
+                'returns': self.returns.state() if self.returns is not None else None}
+
+    def restore(self, state):
+        self.mark[:], self.pos[:] = state['mark'], state['pos']
+        self.corr = state.get('corr')
+        self.blocked.update(state.get('blocked', {}))
+        if self.returns is not None:
+            self.returns.restore(state['returns'])
+
+    def rotate(self, enabled, book):
+        # correlation matrix cached for the symbols any buy until the next rotation can involve
+        if self.returns is None:
+            return
+        cols = np.union1d(enabled, book.held()).astype(np.intp)
+        self.pos[:] = -1
+        self.pos[cols] = np.arange(len(cols))
+        self.corr = self.returns.corr(cols)
+
+    def allow(self, col, usdt, cash, book):
+        """Whether buying `usdt` of grid column `col` keeps every cap."""
+        equity = cash + book.value(self.mark, fallback=book.entry_price)
+        if self.max_weight is not None and usdt > self.max_weight * equity:
+            self.blocked['weight'] += 1
+            return False
+        held = np.flatnonzero(book.active)
+        cost = book.size_usdt[held]
+        if self.max_deployed is not None and cost.sum() + usdt > self.max_deployed * equity:
+            self.blocked['deployed'] += 1
+            return False
+        if self.max_corr is not None and len(held) and self.pos[col] >= 0:
+            k = self.pos[held]
+            c = np.where(k >= 0, self.corr[self.pos[col], k], np.nan)
+            if cost[c >= self.corr_threshold].sum() + usdt > self.max_corr * equity:
+                self.blocked['corr'] += 1
+                return False
+        return True
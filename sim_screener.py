@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Two-stage universe screener for the Wick-Magic simulator.
+
+Stage 1 scores every USDT spot pair cheaply: the tickers (quote volume for
+liquidity, 24h range) plus the daily candles from the on-disk store, which only
+needs a network call for symbols whose store is missing or a day behind.
+Stage 2 fetches full 15m history for the best `shortlist` of those and keeps
+the TOP_N with the highest full candidate score (build_candidates).
+
+The report carries per-stage timings, candle-store hit rates per timeframe
+and the stage-1 rank of every symbol that made the final cut; if the worst of
+those ranks sits near the shortlist size, the shortlist is too small.
+
+  python sim_screener.py --top-n 5 --shortlist 20
+  python sim_screener.py --top-n 5 --shortlist 10,20,40 --replay replay_dir
+"""
+import json
+import time
+import argparse
+from collections import Counter
+from contextlib import contextmanager
+import pandas as pd
+import numpy as np
+
+import sim_wickgun_sim as sim
+from sim_data import open_source
+from sim_resample import Resampler
+from sim_config import add_arguments, configure
+
+SHORTLIST = 20
+MIN_QUOTE_VOLUME = 100_000.0  # 24h USDT volume below which a pair is not scored at all
+DAILY_BARS = 35 + 20  # daily candles per symbol for stage 1 (35-day impulse window + slack)
+
+
+def daily_features(df, window_days=35, spike_days=7):
+    # impulse/retrace, daily volume spike and mean wickiness from one symbol's 1d candles
+    pump, retr = sim.impulse_retrace(df, window_days)
+    vol = df['volume'].to_numpy(dtype=float)
+    vol_spike = np.nan
+    if len(vol) > spike_days:
+        avg = vol[-(spike_days + 1):-1].mean()
+        vol_spike = vol[-1] / avg if avg > 0 else np.nan
+    tail = df.tail(spike_days)
+    o, h, l, c = (tail[k].to_numpy(dtype=float) for k in ('open', 'high', 'low', 'close'))
+    wick = np.nanmean((h - np.maximum(o, c) + np.minimum(o, c) - l) / np.maximum(h - l, 1e-12)) if len(tail) else np.nan
+    return retr, vol_spike, wick, pump
+
+def prescore(tickers, daily, params=None):
+    """Stage-1 table over every symbol in `daily` ({symbol: 1d df or Exception}), best first."""
+    rows = []
+    for s, df in daily.items():
+        t = tickers.get(s, {})
+        hi, lo = sim.safe_float(t.get('high')), sim.safe_float(t.get('low'))
+        feats = (np.nan,) * 4 if isinstance(df, Exception) or not len(df) else daily_features(df)
+        rows.append((s, sim.safe_float(t.get('quoteVolume')), *feats, (hi - lo) / lo if lo > 0 else np.nan))
+    table = pd.DataFrame(rows, columns=['symbol', 'quote_volume', 'retr', 'vol_spike', 'wick', 'pump', 'rng24'])
+    weights = tuple((params or sim.default_params())[k] for k in sim.WEIGHT_NAMES)
+    table['score'] = sim.score_matrix(*(table[k].to_numpy(dtype=float) for k in sim.SCORE_INPUTS), weights=weights)
+    # ties (e.g. no daily data anywhere) fall back to the old quoteVolume ranking
+    return table.sort_values(['score', 'quote_volume'], ascending=False, kind='stable').reset_index(drop=True)
+
+def hit_rates(stats):
+    # share of store lookups served without any network call; None for uncacheable sources
+    total = stats['hit'] + stats['tail'] + stats['miss']
+    return {**stats, 'hit_rate': stats['hit'] / total if total else None}
+
+def screen_universe(ex, top_n, shortlist=SHORTLIST, params=None):
+    """-> (top symbols, tickers, {symbol: 15m df} for the top, report dict)."""
+    timings, cache = {}, {'1d': Counter(), sim.RESOLUTION: Counter()}
+
+    @contextmanager
+    def stage(name):
+        t0 = time.perf_counter()
+        yield
+        timings[name] = round(time.perf_counter() - t0, 4)
+
+    with stage('tickers'):
+        markets = ex.load_markets()
+        usdt = [s for s, m in markets.items() if isinstance(m, dict) and m.get('spot') and s.endswith('/USDT')]
+        tickers = ex.fetch_tickers(usdt)
+        liquid = [s for s in usdt if sim.safe_float(tickers.get(s, {}).get('quoteVolume')) >= MIN_QUOTE_VOLUME]
+    with stage('daily'):
+        daily = sim.fetch_ohlcv_dfs(ex, liquid, '1d', None, DAILY_BARS, stats=cache['1d'])
+    with stage('prescore'):
+        table = prescore(tickers, daily, params)
+        short = table['symbol'].head(shortlist).tolist()
+    with stage('fetch'):
+        ohlcvs = sim.fetch_universe_ohlcv(ex, short, stats=cache[sim.RESOLUTION])
+    with stage('score'):
+        cand_df = sim.build_candidates(Resampler(ohlcvs, sim.RESOLUTION), tickers) if ohlcvs else pd.DataFrame(columns=['symbol'])
+        top = cand_df['symbol'].head(top_n).tolist()
+    pre_rank = {s: i for i, s in enumerate(table['symbol'])}
+    report = {
+        'universe': len(usdt), 'liquid': len(liquid), 'shortlist': len(short), 'selected': top,
+        'prescreen_rank': {s: pre_rank[s] for s in top},
+        'worst_prescreen_rank': max((pre_rank[s] for s in top), default=None),
+        'stages_sec': timings,
+        'cache': {tf: hit_rates(c) for tf, c in cache.items()},
+    }
+    return top, tickers, {s: ohlcvs[s] for s in top}, report
+
+def main():
+    ap = argparse.ArgumentParser(description='Two-stage universe screen for the Wick-Magic simulator')
+    ap.add_argument('--shortlist', default=str(SHORTLIST), help='comma list to compare sizes, e.g. 10,20,40')
+    ap.add_argument('--replay', metavar='DIR', help='screen a recorded replay directory')
+    ap.add_argument('--out', default='screener_report.json')
+    add_arguments(ap)
+    args = ap.parse_args()
+    configure(args, sim)
+
+    ex = open_source(args.replay)
+    reports = []
+    for k in (int(x) for x in args.shortlist.split(',')):
+        top, _, _, report = screen_universe(ex, sim.TOP_N, k)
+        reports.append(report)
+        print(f"shortlist {k:>4}: worst stage-1 rank {report['worst_prescreen_rank']}  "
+              f"1d hit rate {report['cache']['1d']['hit_rate']}  {report['stages_sec']}  -> {top}")
+    with open(args.out, 'w') as f:
+        json.dump(reports, f, indent=2)
+    print('Wrote', args.out)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Parameter sweep for the Wick-Magic simulator (sim_wickgun_sim.py).
+Candles are fetched and aligned once, the grid is memory-mapped from the grid
+store (sim_gridstore; GRID_STORE, or a throwaway one in /dev/shm) and the
+variants run across a process pool. Output: one table, sweep_results.csv
+(or .parquet if --out ends in .parquet and pyarrow is installed), with the
+sim_analytics metrics (sharpe, max_drawdown_pct, ...) for every variant.
+
+  python sim_sweep.py --set PER_BUY=30,50 --set MAX_PAIRS=6,8,10
+  python sim_sweep.py --random 2000 --set PER_BUY=20:80 --set GAIN_TARGET=0.01:0.05 --workers 8
+
+NAME=a,b,c lists values (grid product, or random choice with --random);
+NAME=lo:hi is a range and needs --random. Unset names keep the script defaults.
+
+Finished variants are appended to <out>.partial.csv as they complete. With
+--resume the sweep reads its candles from a replay directory (<out>_replay,
+recorded on the first run unless --replay is given) and skips the variants
+already in the partial file, so a preempted sweep started with --resume can
+be restarted with the same command.
+"""
+import os
+import time
+import argparse
+import itertools
+import random
+import shutil
+from multiprocessing import Pool
+import pandas as pd
+
+import sim_wickgun_sim as sim
+from sim_data import open_source, parse_timeframe
+from sim_resample import Resampler
+from sim_analytics import analyze
+from sim_gridstore import save_grid, load_grid, temp_store
+from sim_config import SimConfig, add_arguments, configure
+
+INT_PARAMS = ('MAX_PAIRS', 'TOP_N')
+
+def parse_axis(spec):
+    name, _, vals = spec.partition('=')
+    name = name.strip().upper()
+    if name not in sim.PARAM_NAMES:
+        raise SystemExit(f'unknown parameter {name!r}; expected one of {", ".join(sim.PARAM_NAMES)}')
+    cast = int if name in INT_PARAMS else float
+    if ':' in vals:
+        lo, hi = vals.split(':', 1)
+        return name, ('range', cast(lo), cast(hi))
+    return name, ('values', [cast(v) for v in vals.split(',') if v.strip()])
+
+def build_variants(axes, n_random=None, seed=0):
+    if n_random is None:
+        for name, axis in axes.items():
+            if axis[0] == 'range':
+                raise SystemExit(f'{name}: lo:hi ranges need --random N')
+        names = list(axes)
+        return [sim.default_params(**dict(zip(names, combo)))
+                for combo in itertools.product(*(axes[n][1] for n in names))]
+    rng = random.Random(seed)
+    variants = []
+    for _ in range(n_random):
+        over = {}
+        for name, axis in axes.items():
+            if axis[0] == 'values':
+                over[name] = rng.choice(axis[1])
+            elif name in INT_PARAMS:
+                over[name] = rng.randint(axis[1], axis[2])
+            else:
+                over[name] = rng.uniform(axis[1], axis[2])
+        variants.append(sim.default_params(**over))
+    return variants
+
+# Shared grid: the parent puts the aligned grid in the memory-mapped store once (or
+# reuses it from GRID_STORE), along with the subset grids for smaller TOP_N values,
+# and workers map the same files read-only instead of building their own copies.
+
+def share_grid(grid):
+    """-> (temp dir to remove afterwards or None, path workers attach to)."""
+    if 'store' in grid:
+        return None, grid['store']
+    tmp = temp_store()
+    path = os.path.join(tmp, 'grid')
+    save_grid(grid, path, sim.GRID_DTYPE)
+    return tmp, path
+
+def unshare_grid(tmp):
+    if tmp is not None:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def attach_grid(path):
+    return load_grid(path)
+
+def universe(grid, ranked, top_n):
+    return [s for s in ranked[:top_n] if s in grid['sym_index']]
+
+def share_subsets(grid, ranked, variants):
+    """The smaller universes the variants ask for, stored once -> (temp dir or None, {n symbols: path})."""
+    subsets = {}
+    for top_n in sorted({v['TOP_N'] for v in variants}):
+        syms = universe(grid, ranked, top_n)
+        if len(syms) < len(grid['symbols']):
+            subsets[len(syms)] = syms
+    if not subsets:
+        return None, {}
+    tmp = temp_store()
+    paths = {n: os.path.join(tmp, f'top{n}') for n in subsets}
+    for n, syms in subsets.items():
+        save_grid(sim.subset_grid(grid, syms), paths[n], sim.GRID_DTYPE)
+    return tmp, paths
+
+_WORKER = {}
+
+def init_worker(config, spec, sub_specs, cand_df, ranked, feats, fills):
+    # a spawned worker imports the engine afresh; give it the parent's settings
+    config.apply(sim)
+    grid = attach_grid(spec)
+    _WORKER.update(grid=grid, sub_specs=sub_specs, cand_df=cand_df, ranked=ranked, fills=fills,
+                   subsets={len(grid['symbols']): (grid, feats, fills)})
+
+def run_variant(params):
+    grid = _WORKER['grid']
+    syms = universe(grid, _WORKER['ranked'], params['TOP_N'])
+    # one (grid, features, fills) per universe size per worker; TOP_N usually takes few values
+    if len(syms) not in _WORKER['subsets']:
+        g = attach_grid(_WORKER['sub_specs'][len(syms)])
+        fills = _WORKER['fills'].select([grid['sym_index'][s] for s in syms])
+        _WORKER['subsets'][len(syms)] = (g, sim.rolling_features(g, sim.RECALC_INTERVAL) if sim.ROLLING_SCORES else None,
+                                         fills)
+    g, feats, fills = _WORKER['subsets'][len(syms)]
+    # features are shared; only the (recalc x symbol) scoring pass depends on the variant's weights
+    scores = sim.score_features(*feats, params) if feats is not None else None
+    cand_df = _WORKER['cand_df']
+    cand_df = cand_df[cand_df['symbol'].isin(syms)].reset_index(drop=True)
+    equity = []
+    cash, book, trades = sim.run_bar_loop(g, cand_df, sim.RECALC_INTERVAL, params, scores, fills, equity=equity)
+    final_value, total_return = sim.mark_to_market(g, cash, book, params['START_USDT'])
+    sells = [t for t in trades if t['side'] == 'SELL']
+    return {
+        **params,
+        'end': final_value,
+        'return_pct': total_return*100,
+        'trades': len(sells),
+        'wins': sum(1 for t in sells if t['reason'] == 'GAIN'),
+        'open_positions': len(book),
+        **analyze(trades, equity, params['START_USDT'], parse_timeframe(sim.RESOLUTION) * 1000, by_symbol=False),
+    }
+
+def run_sweep(variants, grid, cand_df, ranked, fills, workers=None, on_result=None):
+    # features depend only on the data, so the full universe is featurized once up front
+    feats = sim.rolling_features(grid, sim.RECALC_INTERVAL) if sim.ROLLING_SCORES else None
+    tmp, spec = share_grid(grid)
+    sub_tmp, sub_specs = share_subsets(grid, ranked, variants)
+    try:
+        workers = workers or os.cpu_count() or 1
+        chunk = max(1, len(variants) // (workers * 8))
+        with Pool(workers, initializer=init_worker,
+                  initargs=(SimConfig.from_module(sim), spec, sub_specs, cand_df, ranked, feats, fills)) as pool:
+            results = []
+            for r in pool.imap_unordered(run_variant, variants, chunksize=chunk):
+                results.append(r)
+                if on_result is not None:
+                    on_result(r)
+    finally:
+        unshare_grid(tmp)
+        unshare_grid(sub_tmp)
+    return pd.DataFrame(results)
+
+def variant_key(params):
+    return tuple(None if pd.isna(params[k]) else float(params[k]) for k in sim.PARAM_NAMES)
+
+def load_partial(path):
+    """Rows finished by an earlier run of the sweep; a torn last line (killed mid-write) is cut off."""
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    with open(path, 'rb+') as f:
+        data = f.read()
+        f.truncate(data.rfind(b'\n') + 1)
+    return pd.read_csv(path, float_precision='round_trip') if data.count(b'\n') > 1 else pd.DataFrame()
+
+def append_row(path, row):
+    # one finished variant, flushed right away so a kill loses at most the runs in flight
+    new = not os.path.exists(path) or os.path.getsize(path) == 0
+    pd.DataFrame([row]).to_csv(path, mode='a', header=new, index=False)
+
+def write_results(df, out):
+    if out.endswith('.parquet'):
+        df.to_parquet(out, index=False)
+    else:
+        df.to_csv(out, index=False)
+
+def main():
+    ap = argparse.ArgumentParser(description='Parameter sweep over the Wick-Magic simulator')
+    ap.add_argument('--set', action='append', default=[], metavar='NAME=VALUES', help='a,b,c values or lo:hi range')
+    ap.add_argument('--random', type=int, default=None, metavar='N', help='draw N random variants instead of the full grid')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--workers', type=int, default=None)
+    ap.add_argument('--out', default='sweep_results.csv')
+    ap.add_argument('--replay', metavar='DIR', help='load candles from a recorded replay directory')
+    ap.add_argument('--resume', action='store_true', help='skip variants finished by an earlier run of this sweep')
+    add_arguments(ap)
+    args = ap.parse_args()
+    configure(args, sim)
+
+    axes = dict(parse_axis(s) for s in args.set)
+    variants = build_variants(axes, args.random, args.seed)
+    partial_path = args.out + '.partial.csv'
+    done = load_partial(partial_path) if args.resume else pd.DataFrame()
+    if not args.resume and os.path.exists(partial_path):
+        os.remove(partial_path)
+    if len(done):
+        seen = {variant_key(r) for r in done.to_dict('records')}
+        variants = [v for v in variants if variant_key(v) not in seen]
+    print('Variants:', len(variants), f'({len(done)} already done)' if len(done) else '')
+    # load the widest universe any variant asks for, once
+    if args.resume and not args.replay:
+        # every restart of a resumable sweep must see the candles of the first run; once a
+        # variant has finished that recording is complete, before that it is redone
+        replay = os.path.splitext(args.out)[0] + '_replay'
+        if len(done) and not os.path.exists(os.path.join(replay, 'snapshot.json')):
+            raise SystemExit(f'{partial_path} has {len(done)} finished variants but no recorded candles in {replay}/: '
+                             'the first run was not started with --resume. Pass the --replay it used, or start over '
+                             'without --resume.')
+        ex = open_source(replay) if len(done) else open_source(record=replay)
+    else:
+        ex = open_source(args.replay)
+    ranked, tickers = sim.load_universe(ex, max((v['TOP_N'] for v in variants), default=sim.TOP_N))
+    ohlcvs = sim.fetch_universe_ohlcv(ex, ranked)
+    cand_df = sim.build_candidates(Resampler(ohlcvs, sim.RESOLUTION), tickers)
+    grid = sim.aligned_grid(ex, ohlcvs)
+    fills = sim.make_fill_model(ex, grid['symbols'])
+    t0 = time.time()
+    results = run_sweep(variants, grid, cand_df, ranked, fills, args.workers,
+                        on_result=lambda r: append_row(partial_path, r))
+    elapsed = time.time() - t0
+    results = pd.concat([done, results], ignore_index=True) if len(done) else results
+    results = results.sort_values('return_pct', ascending=False).reset_index(drop=True)
+    write_results(results, args.out)
+    os.remove(partial_path)
+    print(f'Done. {len(results)} variants in {elapsed:.1f}s -> {args.out}')
+    print(results.head(10).to_string(index=False))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Walk-forward optimization for the Wick-Magic rotation strategy.
+History is split into rolling train/test windows. Each train window picks
+the best variant (by return) from a grid or random sample over the strategy
+parameters and score weights. The train runs of all folds are spread over a
+process pool. The picked variants are then run on their test windows, in
+order, and the out-of-sample equity is stitched together.
+
+Rolling features are computed once over the full history and reused by every
+fold and variant; per variant only the cheap (recalc x symbol) scoring pass is
+redone. Outputs: walkforward_folds.csv, walkforward_equity.csv.
+
+  python sim_walkforward.py --days 120 --train-days 28 --test-days 7 \\
+      --set GAIN_TARGET=0.015,0.025,0.04 --set STOP_LOSS=-0.03,-0.05 --set MAX_PAIRS=4,8
+"""
+import os
+import time
+import argparse
+from multiprocessing import Pool
+import pandas as pd
+import numpy as np
+
+import sim_wickgun_sim as sim
+from sim_data import open_source
+from sim_sweep import parse_axis, build_variants, share_grid, unshare_grid, attach_grid
+from sim_config import SimConfig, add_arguments, configure
+
+DAY_MS = 24*60*60*1000
+
+
+def make_folds(timeline, train_ms, test_ms):
+    """[(train_lo, train_hi, test_lo, test_hi)] grid row ranges, stepping by the test window."""
+    if not len(timeline):
+        return []
+    folds = []
+    t0, t_end = int(timeline[0]), int(timeline[-1])
+    start = t0
+    while start + train_ms <= t_end:
+        bounds = [start, start + train_ms, start + train_ms, start + train_ms + test_ms]
+        lo, mid, _, hi = (int(np.searchsorted(timeline, b, side='left')) for b in bounds)
+        if mid >= len(timeline) or hi <= mid:
+            break
+        folds.append((lo, mid, mid, hi))
+        start += test_ms
+    return folds
+
+def segment_rows(folds, timeline):
+    # every global row any fold window will recalc at (one shared feature pass covers them all)
+    rows = set()
+    for lo, mid, _, hi in folds:
+        for a, b in ((lo, mid), (mid, hi)):
+            rows.update(a + r for r in sim.recalc_rows(timeline[a:b], sim.RECALC_INTERVAL))
+    return sorted(rows)
+
+def run_segment(grid, feats, lo, hi, params, fills, equity=None):
+    """One window of the grid with `params`; features come from the shared pass."""
+    rows_index, arrays = feats
+    seg = sim.slice_grid(grid, lo, hi)
+    rows = sim.recalc_rows(seg['timeline'], sim.RECALC_INTERVAL)
+    idx = [rows_index[lo + r] for r in rows]
+    scores = sim.score_features(rows, {k: v[idx] for k, v in arrays.items()}, params)
+    cash, book, trades = sim.run_bar_loop(seg, None, sim.RECALC_INTERVAL, params, scores, fills, equity=equity)
+    final_value, total_return = sim.mark_to_market(seg, cash, book, params['START_USDT'])
+    return final_value, total_return, trades
+
+_WF = {}
+
+def init_worker(config, spec, feats, fills):
+    config.apply(sim)  # spawned workers start from the engine defaults
+    grid = attach_grid(spec)
+    _WF.update(grid=grid, feats=feats, fills=fills)
+
+def train_task(task):
+    fold, k, lo, hi, params = task
+    _, total_return, trades = run_segment(_WF['grid'], _WF['feats'], lo, hi, params, _WF['fills'])
+    return fold, k, total_return*100, sum(1 for t in trades if t['side'] == 'SELL')
+
+def walk_forward(grid, variants, folds, fills, workers=None):
+    """Returns (per-fold DataFrame, stitched out-of-sample equity DataFrame)."""
+    rows = segment_rows(folds, grid['timeline'])
+    rows, arrays = sim.rolling_features(grid, sim.RECALC_INTERVAL, rows=rows)
+    feats = ({r: i for i, r in enumerate(rows)}, arrays)
+    tasks = [(f, k, lo, mid, v) for f, (lo, mid, _, _) in enumerate(folds) for k, v in enumerate(variants)]
+    tmp, spec = share_grid(grid)
+    try:
+        workers = workers or os.cpu_count() or 1
+        chunk = max(1, len(tasks) // (workers * 8))
+        with Pool(workers, initializer=init_worker, initargs=(SimConfig.from_module(sim), spec, feats, fills)) as pool:
+            train = list(pool.imap_unordered(train_task, tasks, chunksize=chunk))
+    finally:
+        unshare_grid(tmp)
+    best = {}
+    for f, k, ret, n in sorted(train, key=lambda r: (r[0], r[1])):
+        if f not in best or ret > best[f][1]:
+            best[f] = (k, ret, n)
+    # out-of-sample: chain the test windows, each starting from the previous window's end value;
+    # positions still open at a window end are marked at its last close and carried over as cash
+    capital = variants[0]['START_USDT']
+    fold_rows, equity = [], []
+    tl = grid['timeline']
+    for f, (lo, mid, _, hi) in enumerate(folds):
+        k, train_ret, train_trades = best[f]
+        params = dict(variants[k], START_USDT=capital)
+        curve = []
+        end, ret, trades = run_segment(grid, feats, mid, hi, params, fills, equity=curve)
+        for e in curve:
+            e['fold'] = f
+        equity.extend(curve)
+        fold_rows.append({
+            'fold': f,
+            'train_start': int(tl[lo]), 'train_end': int(tl[mid - 1]),
+            'test_start': int(tl[mid]), 'test_end': int(tl[hi - 1]),
+            **{f'best_{n}': variants[k][n] for n in sim.PARAM_NAMES if n not in ('START_USDT', 'TOP_N')},
+            'train_return_pct': train_ret, 'train_trades': train_trades,
+            'test_start_value': capital, 'test_end_value': end, 'test_return_pct': ret*100,
+            'test_trades': sum(1 for t in trades if t['side'] == 'SELL'),
+        })
+        capital = end
+    return pd.DataFrame(fold_rows), pd.DataFrame(equity)
+
+def main():
+    ap = argparse.ArgumentParser(description='Walk-forward optimization over the Wick-Magic simulator')
+    ap.add_argument('--set', action='append', default=[], metavar='NAME=VALUES', help='a,b,c values or lo:hi range')
+    ap.add_argument('--random', type=int, default=None, metavar='N', help='N random variants per fold instead of the full grid')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--train-days', type=float, default=14)
+    ap.add_argument('--test-days', type=float, default=7)
+    ap.add_argument('--workers', type=int, default=None)
+    ap.add_argument('--replay', metavar='DIR', help='load candles from a recorded replay directory')
+    ap.add_argument('--out-prefix', default='walkforward')
+    add_arguments(ap)  # --days sets the history to load
+    args = ap.parse_args()
+    configure(args, sim)
+
+    axes = dict(parse_axis(s) for s in args.set)
+    if 'TOP_N' in axes:
+        raise SystemExit('TOP_N fixes the universe and cannot vary inside a walk-forward run')
+    variants = build_variants(axes, args.random, args.seed)
+    ex = open_source(args.replay)
+    top, _ = sim.load_universe(ex, sim.TOP_N)
+    ohlcvs = sim.fetch_universe_ohlcv(ex, top)
+    grid = sim.aligned_grid(ex, ohlcvs)
+    folds = make_folds(grid['timeline'], int(args.train_days * DAY_MS), int(args.test_days * DAY_MS))
+    if not folds:
+        raise SystemExit('history too short for one train + test window')
+    print(f'Variants: {len(variants)}  Folds: {len(folds)}')
+    fills = sim.make_fill_model(ex, grid['symbols'])
+    t0 = time.time()
+    folds_df, equity_df = walk_forward(grid, variants, folds, fills, args.workers)
+    folds_df.to_csv(f'{args.out_prefix}_folds.csv', index=False)
+    equity_df.to_csv(f'{args.out_prefix}_equity.csv', index=False)
+    start = folds_df['test_start_value'].iloc[0]
+    end = folds_df['test_end_value'].iloc[-1]
+    print(folds_df[['fold', 'train_return_pct', 'test_return_pct', 'test_end_value']].to_string(index=False))
+    print(f'Done in {time.time() - t0:.1f}s. Out-of-sample: {start:.2f} -> {end:.2f} ({(end - start) / start * 100:.2f}%)')
+
+if __name__ == '__main__':
+    main()
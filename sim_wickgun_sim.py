@@ -1,16 +1,37 @@
 #!/usr/bin/env python3
 """
 Lightweight Wick-Magic rotation + simple simulator (mode B) for Bybit spot 15m candles.
-Outputs: trade_log.csv, summary.json
+Outputs: trade_log.csv, equity_curve.csv, summary.json (with sim_analytics metrics)
+
+Settings are the module constants below; --config FILE and per-setting flags
+override them for one run (see sim_config):
+
+  python sim_wickgun_sim.py --config sim_configs/sim_tmp_2.json --replay replay_dir
+  python sim_wickgun_sim.py --per-buy 30 --max-pairs 10 --fill-path ohlc
 """
-import time
+import os
+import sys
 import json
 import math
+import argparse
 from datetime import datetime, timezone, timedelta
-import ccxt
 import pandas as pd
 import numpy as np
 
+from sim_data import OHLCV_COLS, symbol_key, ts_to_ms, parse_timeframe, open_source
+from sim_features import RollingFeatures
+from sim_fills import FillModel, SubBars
+from sim_costs import BookCosts, fetch_order_books
+from sim_book import PositionBook
+from sim_resample import Resampler
+from sim_risk import RiskEngine
+from sim_gridstore import grid_key, stored_grid
+from sim_output import trade_writer, equity_writer, read_output
+from sim_analytics import analyze, json_safe
+from sim_checkpoint import CHECKPOINT_PATH, Checkpointer, load_checkpoint
+from sim_profile import PROFILE_PATHS, Profiler, profiled
+from sim_config import add_arguments, configure
+
 # --- Config ---
 # Reduced-size defaults to fit constrained executor environment.
 START_USDT = 1000.0
@@ -23,6 +44,37 @@ STOP_LOSS = -0.05
 DAYS = 30
 RESOLUTION = '15m'
 TOP_N = 5
+# candidate score weights (retrace, pump, volume spike, wickiness)
+W_RETR = 0.35
+W_PUMP = 0.25
+W_SPIKE = 0.20
+W_WICKS = 0.15
+CACHE_DIR = 'ohlcv_cache'  # on-disk candle store; None = always hit the exchange
+GRID_STORE = None  # e.g. 'grid_store': aligned grids as memory-mapped files shared by concurrent runs (see sim_gridstore)
+GRID_DTYPE = 'float64'  # OHLCV dtype in the grid store; 'float32' halves it at ~7 significant digits
+RECALC_INTERVAL = 4*60*60  # rotation recalc, seconds
+FILL_PATH = 'worst'  # intrabar order when a bar touches target and stop; see sim_fills.FILL_PATHS
+SLIPPAGE_MODEL = 'flat'  # 'flat' = SLIPPAGE on every fill; 'book' = spread + depth impact from order-book snapshots (see sim_costs)
+OUTPUT_FORMAT = 'csv'  # trade_log / equity_curve as 'csv' or 'parquet' (chunked, see sim_output)
+UNIVERSE = 'volume'  # 'volume' = TOP_N by ticker quoteVolume; 'screener' = two-stage screen (see sim_screener)
+ROLLING_SCORES = True  # rescore from rolling features at every recalc; False = one static ranking over the whole window
+# portfolio caps as fractions of equity, checked before each buy (see sim_risk); None = off.
+# Off by default: turning one on changes default results (e.g. MAX_CORR_EXPOSURE=0.25 blocks most
+# buys on a correlated top-5 universe once 4 x PER_BUY are held), so enable them per run/config.
+MAX_WEIGHT = None  # one position, e.g. 0.10
+MAX_DEPLOYED = None  # all open positions, e.g. 1.0
+MAX_CORR_EXPOSURE = None  # open positions correlated >= CORR_THRESHOLD with the one being bought, e.g. 0.25
+CORR_THRESHOLD = 0.8
+
+# names a sweep / config may override per run
+PARAM_NAMES = ('START_USDT', 'PER_BUY', 'MAX_PAIRS', 'FEE_RATE', 'SLIPPAGE', 'GAIN_TARGET', 'STOP_LOSS', 'TOP_N',
+               'W_RETR', 'W_PUMP', 'W_SPIKE', 'W_WICKS', 'MAX_WEIGHT', 'MAX_DEPLOYED', 'MAX_CORR_EXPOSURE', 'CORR_THRESHOLD')
+WEIGHT_NAMES = ('W_RETR', 'W_PUMP', 'W_SPIKE', 'W_WICKS')
+
+def default_params(**overrides):
+    params = {k: globals()[k] for k in PARAM_NAMES}
+    params.update(overrides)
+    return params
 
 # Minimal scoring from your script (simplified)
 def safe_float(x):
@@ -33,21 +85,120 @@ def safe_float(x):
 
 # reuse some functions from your script logic (simplified)
 
-def fetch_ohlcv_df(exchange, symbol, timeframe, since, limit):
-    data = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
-    df = pd.DataFrame(data, columns=["ts", "open", "high", "low", "close", "volume"]) 
-    df['ts'] = pd.to_datetime(df['ts'], unit='ms', utc=True)
+def ohlcv_to_df(ts, vals):
+    df = pd.DataFrame(np.asarray(vals, dtype=float), columns=OHLCV_COLS[1:])
+    df.insert(0, 'ts', pd.to_datetime(np.asarray(ts, dtype=np.int64), unit='ms', utc=True))
     return df
 
-def jon_impulse_retrace_1d(exchange, symbol, window_days=35, now_ts=None):
-    # fetch daily
-    limit = window_days + 20
-    if now_ts is None:
-        now_ts = int(time.time()*1000)
+def split_ohlcv(data):
+    # ccxt rows -> (int64 ts, float64 [open, high, low, close, volume])
+    arr = np.asarray(data, dtype=float).reshape(-1, 6)
+    return arr[:, 0].astype(np.int64), arr[:, 1:]
+
+# On-disk candle store: one directory per (exchange, symbol), two .npy files per
+# timeframe (int64 ts + float64 ohlcv) read back memory-mapped, plus a small json
+# recording the earliest `since` the store is known to cover.
+
+def cache_paths(exchange_id, symbol, timeframe):
+    d = os.path.join(CACHE_DIR, exchange_id, symbol_key(symbol))
+    base = os.path.join(d, timeframe)
+    return d, base + '.ts.npy', base + '.ohlcv.npy', base + '.json'
+
+def load_cached_ohlcv(exchange_id, symbol, timeframe):
+    _, ts_path, val_path, meta_path = cache_paths(exchange_id, symbol, timeframe)
+    if not (os.path.exists(ts_path) and os.path.exists(val_path) and os.path.exists(meta_path)):
+        return None
     try:
-        df = fetch_ohlcv_df(exchange, symbol, '1d', None, limit)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        ts = np.load(ts_path, mmap_mode='r')
+        vals = np.load(val_path, mmap_mode='r')
     except Exception:
-        return np.nan, np.nan
+        return None
+    if len(ts) != len(vals):
+        return None
+    return ts, vals, meta.get('since')
+
+def store_cached_ohlcv(exchange_id, symbol, timeframe, ts, vals, since):
+    d, ts_path, val_path, meta_path = cache_paths(exchange_id, symbol, timeframe)
+    os.makedirs(d, exist_ok=True)
+    # write to temp files then rename so a killed run never leaves a torn cache
+    for path, arr in ((ts_path, np.ascontiguousarray(ts, dtype=np.int64)), (val_path, np.ascontiguousarray(vals, dtype=float))):
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, arr)
+        os.replace(path + '.tmp', path)
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump({'since': since, 'rows': int(len(ts))}, f)
+    os.replace(meta_path + '.tmp', meta_path)
+
+def fetch_ohlcv_dfs(exchange, symbols, timeframe, since, limit, stats=None):
+    """fetch_ohlcv_df for many symbols in one batch -> {symbol: df or the Exception raised}.
+
+    The store decides per symbol what is missing, then every network request
+    goes out in one exchange.fetch_ohlcv_many() call (concurrent for ccxt).
+    `stats` (a Counter) counts symbols served as 'hit' (disk only), 'tail'
+    (disk + the missing tail), 'miss' (full fetch) or 'uncached'.
+    """
+    use_cache = CACHE_DIR is not None and getattr(exchange, 'cacheable', True)
+    ex_id = getattr(exchange, 'id', type(exchange).__name__)
+    now = exchange.milliseconds()
+    tf_ms = exchange.parse_timeframe(timeframe) * 1000
+    plans, requests = {}, []
+    for s in symbols:
+        cached = load_cached_ohlcv(ex_id, s, timeframe) if use_cache else None
+        if cached is None or len(cached[0]) == 0 or (since is not None and (cached[2] is None or since < cached[2])):
+            # nothing usable on disk (or the request reaches further back): full fetch
+            plans[s] = (None, len(requests))
+            requests.append((s, timeframe, since, limit))
+            kind = 'miss' if use_cache else 'uncached'
+        elif now >= int(cached[0][-1]) + tf_ms:
+            # only the missing tail; re-fetch the last stored bar too since it may have been still forming
+            plans[s] = (cached, len(requests))
+            requests.append((s, timeframe, int(cached[0][-1]), limit))
+            kind = 'tail'
+        else:
+            plans[s] = (cached, None)
+            kind = 'hit'
+        if stats is not None:
+            stats[kind] += 1
+    fetched = exchange.fetch_ohlcv_many(requests) if requests else []
+    out = {}
+    for s in symbols:
+        cached, k = plans[s]
+        if k is not None and isinstance(fetched[k], Exception):
+            out[s] = fetched[k]
+            continue
+        if cached is None:
+            ts, vals = split_ohlcv(fetched[k])
+            covered = since if since is not None else (int(ts[0]) if len(ts) else None)
+            if use_cache:
+                store_cached_ohlcv(ex_id, s, timeframe, ts, vals, covered)
+        else:
+            ts, vals, covered = cached
+            if k is not None:
+                new_ts, new_vals = split_ohlcv(fetched[k])
+                if len(new_ts):
+                    keep = int(np.searchsorted(ts, new_ts[0], side='left'))
+                    ts = np.concatenate([ts[:keep], new_ts])
+                    vals = np.concatenate([vals[:keep], new_vals])
+                    store_cached_ohlcv(ex_id, s, timeframe, ts, vals, covered)
+        # serve the requested window the way the exchange would: from `since` forward, or the latest `limit` bars
+        if since is not None:
+            lo = int(np.searchsorted(ts, since, side='left'))
+            ts, vals = ts[lo:lo + limit] if limit else ts[lo:], vals[lo:lo + limit] if limit else vals[lo:]
+        elif limit:
+            ts, vals = ts[-limit:], vals[-limit:]
+        out[s] = ohlcv_to_df(ts, vals)
+    return out
+
+def fetch_ohlcv_df(exchange, symbol, timeframe, since, limit):
+    df = fetch_ohlcv_dfs(exchange, [symbol], timeframe, since, limit)[symbol]
+    if isinstance(df, Exception):
+        raise df
+    return df
+
+def impulse_retrace(df, window_days=35):
+    # pump = (high - low) / low over the window, retr = how far the close has given back from the high
     if df is None or len(df) < 10:
         return np.nan, np.nan
     df = df.tail(window_days)
@@ -60,6 +211,14 @@ def jon_impulse_retrace_1d(exchange, symbol, window_days=35, now_ts=None):
     retr = (high - current) / (high - low)
     return float(pump), float(retr)
 
+def jon_impulse_retrace_1d(bars, symbol, window_days=35):
+    # completed daily bars resampled from the base candles (bars: a sim_resample.Resampler)
+    try:
+        df = bars.get(symbol, '1d', complete=True)
+    except KeyError:
+        return np.nan, np.nan
+    return impulse_retrace(df, window_days)
+
 # simplified score using retrace and volume spike
 
 def score_row(retr, vol_spike, wick, rng24, spr, pump, corr):
@@ -68,57 +227,353 @@ def score_row(retr, vol_spike, wick, rng24, spr, pump, corr):
     s_spike = 0.0 if np.isnan(vol_spike) else clamp((vol_spike - 1.0) / 4.0, 0.0, 1.0)
     s_wicks = 0.0 if np.isnan(wick) else clamp((wick - 0.20) / 0.50, 0.0, 1.0)
     s_rng = 0.0 if np.isnan(rng24) else clamp((rng24 - 0.03) / 0.30, 0.0, 1.0)
-    score_0_1 = (0.35 * s_retr + 0.25 * clamp((pump - 0.05)/1.0,0,1) + 0.20 * s_spike + 0.15 * s_wicks)
+    score_0_1 = (W_RETR * s_retr + W_PUMP * clamp((pump - 0.05)/1.0,0,1) + W_SPIKE * s_spike + W_WICKS * s_wicks)
     return float(15.0 * clamp(score_0_1, 0.0, 1.0))
 
 
 def clamp(x, lo, hi):
     return max(lo, min(hi, x))
 
-# Simulator engine (15m resolution)
+SCORE_INPUTS = ('retr', 'vol_spike', 'wick', 'rng24', 'pump')
+
+def score_matrix(retr, vol_spike, wick, rng24, pump, weights=None):
+    """score_row over whole arrays (any broadcastable shape, e.g. time x symbol) in one pass.
+
+    Same NaN handling as score_row: a NaN retr/vol_spike/wick contributes 0,
+    while a NaN pump counts as fully pumped (what clamp() does with NaN).
+    `weights` is (retr, pump, spike, wicks); defaults to the W_* constants.
+    """
+    w_retr, w_pump, w_spike, w_wicks = weights or (W_RETR, W_PUMP, W_SPIKE, W_WICKS)
+    retr, vol_spike, wick, rng24, pump = (np.asarray(a, dtype=float) for a in (retr, vol_spike, wick, rng24, pump))
+    s_retr = np.where(np.isnan(retr), 0.0, 1.0 - np.minimum(1.0, np.abs(retr - 0.5) / 0.5))
+    s_spike = np.where(np.isnan(vol_spike), 0.0, np.clip((vol_spike - 1.0) / 4.0, 0.0, 1.0))
+    s_wicks = np.where(np.isnan(wick), 0.0, np.clip((wick - 0.20) / 0.50, 0.0, 1.0))
+    s_pump = np.where(np.isnan(pump), 1.0, np.clip((pump - 0.05) / 1.0, 0.0, 1.0))
+    score_0_1 = (w_retr * s_retr + w_pump * s_pump + w_spike * s_spike + w_wicks * s_wicks)
+    return 15.0 * np.clip(score_0_1, 0.0, 1.0)
+
+def score_frame(df):
+    # score_matrix over a DataFrame with SCORE_INPUTS columns -> Series aligned to df
+    return pd.Series(score_matrix(*(df[c].to_numpy(dtype=float) for c in SCORE_INPUTS)), index=df.index, name='score')
+
+# Dense bar grid + loop engine
+
+def align_ohlcv(ohlcvs):
+    """Align all symbols once onto the union timeline as (time, symbol) arrays.
+
+    Cell [i, j] holds symbol j's first candle with ts >= timeline[i] (the same
+    row the old per-bar `df[df['ts'] >= t].head(1)` scan picked); `valid` is
+    False where the symbol has no candle at or after that point.
+    """
+    symbols = list(ohlcvs.keys())
+    sym_ts = [ts_to_ms(df['ts']) for df in ohlcvs.values()]
+    sym_vals = [df[OHLCV_COLS[1:]].to_numpy(dtype=float) for df in ohlcvs.values()]
+    timeline = np.unique(np.concatenate(sym_ts or [np.empty(0, np.int64)]))
+    T, S = len(timeline), len(symbols)
+    # timeline position -> row of each symbol's candles, as one (T, S) index into all candles
+    # stacked end to end; positions past a symbol's last candle point at a trailing dummy row
+    lens = np.array([len(ts) for ts in sym_ts], dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(lens)])
+    idx = np.empty((T, S), dtype=np.int64)
+    for j, ts in enumerate(sym_ts):
+        idx[:, j] = np.searchsorted(ts, timeline, side='left')
+    valid = idx < lens
+    flat = np.where(valid, starts[:-1] + idx, starts[-1])
+    all_ts = np.concatenate(sym_ts + [np.zeros(1, np.int64)])
+    all_vals = np.concatenate(sym_vals + [np.full((1, 5), np.nan)])
+    grid = {'timeline': timeline, 'symbols': symbols, 'sym_index': {s: j for j, s in enumerate(symbols)}}
+    for k, col in enumerate(('open', 'high', 'low', 'close', 'volume')):
+        grid[col] = all_vals[flat, k]
+    grid['ts'] = all_ts[flat]
+    grid['valid'] = valid
+    grid['last_close'] = np.array([v[-1, 3] if len(v) else np.nan for v in sym_vals])
+    return grid
+
+def aligned_grid(ex, ohlcvs, store=None):
+    """align_ohlcv(ohlcvs), through the memory-mapped grid store under `store` (default GRID_STORE) if set."""
+    store = store or GRID_STORE
+    if store is None:
+        return align_ohlcv(ohlcvs)
+    cols = OHLCV_COLS[1:]
+    series = {s: (len(df), *(ts_to_ms(df['ts'].iloc[[0, -1]]) if len(df) else (0, 0)),
+                  df[cols].iloc[-1].to_numpy(dtype=float) if len(df) else np.empty(0))
+              for s, df in ohlcvs.items()}
+    key = grid_key(getattr(ex, 'id', type(ex).__name__), RESOLUTION, GRID_DTYPE, series)
+    return stored_grid(store, key, lambda: align_ohlcv(ohlcvs), GRID_DTYPE)
+
+def subset_grid(grid, symbols):
+    """Grid restricted to `symbols`, keeping only bars where one of them trades.
+
+    Gives the same grid align_ohlcv() would have built from just those symbols,
+    so one aligned load can serve runs over smaller universes (e.g. TOP_N sweeps).
+    """
+    cols = np.array([grid['sym_index'][s] for s in symbols], dtype=np.intp)
+    exact = grid['valid'][:, cols] & (grid['ts'][:, cols] == grid['timeline'][:, None])
+    rows = np.flatnonzero(exact.any(axis=1))
+    sub = {'timeline': grid['timeline'][rows], 'symbols': list(symbols), 'sym_index': {s: j for j, s in enumerate(symbols)}}
+    for col in ('open', 'high', 'low', 'close', 'volume', 'ts', 'valid'):
+        sub[col] = grid[col][np.ix_(rows, cols)]
+    sub['last_close'] = grid['last_close'][cols]
+    return sub
+
+def slice_grid(grid, lo, hi):
+    """Rows lo:hi of a grid as a self-contained window (e.g. one walk-forward fold).
+
+    Cells that pointed past the window end (a symbol's next candle falls in a
+    later window) are invalidated, and last_close is the last close inside.
+    """
+    sub = {'timeline': grid['timeline'][lo:hi], 'symbols': grid['symbols'], 'sym_index': grid['sym_index']}
+    for col in ('open', 'high', 'low', 'close', 'volume', 'ts'):
+        sub[col] = grid[col][lo:hi]
+    end = grid['timeline'][hi] if hi < len(grid['timeline']) else np.iinfo(np.int64).max
+    sub['valid'] = grid['valid'][lo:hi] & (sub['ts'] < end)
+    exact = sub['valid'] & (sub['ts'] == sub['timeline'][:, None])
+    last = len(exact) - 1 - np.argmax(exact[::-1], axis=0) if len(exact) else np.zeros(len(grid['symbols']), dtype=np.intp)
+    sub['last_close'] = np.where(exact.any(axis=0), sub['close'][last, np.arange(len(grid['symbols']))], np.nan)
+    return sub
+
+def recalc_rows(timeline, recalc_interval):
+    # grid rows where the rotation recalcs (first bar, then every recalc_interval)
+    rows, last = [], None
+    for i, ts in enumerate(timeline.tolist()):
+        if last is None or (ts - last) >= recalc_interval*1000:
+            rows.append(i)
+            last = ts
+    return rows
 
-def simulate():
-    ex = ccxt.bybit({'enableRateLimit': True, 'options': {'defaultType': 'spot'}})
+def rolling_features(grid, recalc_interval, day_bars=None, rows=None):
+    """Features per symbol at each recalc row, from the bars closed before that row.
+
+    Feeds the grid through RollingFeatures once; returns (rows, {name: (recalc, symbol) array}).
+    Pass `rows` to snapshot other rows than the grid's own recalc rows.
+    """
+    day_bars = day_bars or 86400 // parse_timeframe(RESOLUTION)
+    feats = RollingFeatures(len(grid['symbols']), day_bars=day_bars)
+    exact = grid['valid'] & (grid['ts'] == grid['timeline'][:, None])
+    rows = recalc_rows(grid['timeline'], recalc_interval) if rows is None else sorted(rows)
+    todo = set(rows)
+    o, h, l, c, v = (grid[k] for k in ('open', 'high', 'low', 'close', 'volume'))
+    snaps = []
+    for i in range(len(grid['timeline'])):
+        if i in todo:
+            snaps.append(feats.features())
+        feats.update(o[i], h[i], l[i], c[i], v[i], exact[i])
+    S = len(grid['symbols'])
+    return rows, {k: np.stack([f[k] for f in snaps]) if snaps else np.empty((0, S)) for k in SCORE_INPUTS}
+
+def score_features(rows, feats, params=None):
+    # {row: score vector} from rolling_features output, with the params' score weights
+    weights = tuple((params or default_params())[k] for k in WEIGHT_NAMES)
+    return dict(zip(rows, score_matrix(*(feats[k] for k in SCORE_INPUTS), weights=weights)))
+
+def rolling_scores(grid, recalc_interval, day_bars=None, params=None):
+    """{row: score vector} at each recalc row; the stacked features are scored in one score_matrix pass."""
+    rows, feats = rolling_features(grid, recalc_interval, day_bars)
+    return score_features(rows, feats, params)
+
+BAR_FIELDS = ('ts', 'valid', 'open', 'high', 'low')
+
+def enter_positions(book, enabled, bar, cash, p, trades, symbols, risk=None, costs=None):
+    """Buy each enabled, unheld symbol with a bar at its open while cash (and `risk`) allows; returns cash.
+
+    `bar` holds one row per BAR_FIELDS (a grid row, or a live bar) over all symbols.
+    `costs` (a sim_costs.BookCosts) prices the buys off order-book depth instead of SLIPPAGE.
+    """
+    per_buy, fee_rate, slippage = p['PER_BUY'], p['FEE_RATE'], p['SLIPPAGE']
+    cands = enabled[~book.active[enabled] & bar['valid'][enabled]]
+    opens = bar['open'][cands].astype(float)
+    # fill price for every candidate at once, after slippage
+    prices = opens*(1+slippage) if costs is None else costs.buy_price(cands, opens, per_buy, slippage)
+    for j, effective_price in zip(cands.tolist(), prices.tolist()):
+        # compute qty for PER_BUY after slippage and fee
+        usdt_available = cash if cash>0 else 0
+        if usdt_available < per_buy: continue
+        if risk is not None and not risk.allow(j, per_buy, cash, book): continue
+        qty = (per_buy*(1 - fee_rate)) / effective_price
+        cash -= per_buy
+        entry_ts = int(bar['ts'][j])
+        book.open(j, entry_ts, effective_price, per_buy, qty)
+        trades.append({'symbol': symbols[j], 'side':'BUY', 'ts': entry_ts, 'price': effective_price, 'usdt': per_buy, 'qty': qty})
+    return cash
+
+def exit_positions(book, bar, cash, p, fills, trades, symbols):
+    """Resolve target/stop for every held symbol with a bar, all at once; returns cash."""
+    fee_rate, slippage = p['FEE_RATE'], p['SLIPPAGE']
+    cols = book.held(bar['valid'])
+    if not len(cols):
+        return cash
+    entry = book.entry_price[cols]
+    target = entry*(1+p['GAIN_TARGET'])
+    stop = entry*(1+p['STOP_LOSS'])
+    exited, gain = fills.exits(cols, bar['ts'][cols], bar['open'][cols], bar['high'][cols], bar['low'][cols], target, stop)
+    if not exited.any():
+        return cash
+    cols, gain, target, stop = cols[exited], gain[exited], target[exited], stop[exited]
+    qty = book.qty[cols]
+    # exits fill at the level reached first (minus slippage/fee)
+    level = np.where(gain, target, stop)
+    costs = fills.costs
+    exit_price = (level*(1 - slippage) if costs is None else costs.sell_price(cols, level, qty, slippage))*(1 - fee_rate)
+    usdt_out = qty * exit_price
+    profit = usdt_out - book.size_usdt[cols]
+    for j, px, q, out, pnl, g in zip(cols.tolist(), exit_price.tolist(), qty.tolist(),
+                                     usdt_out.tolist(), profit.tolist(), gain.tolist()):
+        cash += out
+        trades.append({'symbol': symbols[j], 'side':'SELL', 'ts': int(bar['ts'][j]), 'price': px, 'usdt': out,
+                       'qty': q, 'pnl': pnl, 'reason': 'GAIN' if g else 'STOP'})
+    book.close(cols)
+    return cash
+
+def run_bar_loop(grid, cand_df, recalc_interval, params=None, scores=None, fills=None, trades=None, equity=None,
+                 checkpoint=None, resume=None, stats=None):
+    """Walk the aligned grid bar by bar; returns (cash, book, trades).
+
+    With `scores` ({row: score vector}, see rolling_scores) the enabled set is
+    re-ranked at every recalc; otherwise cand_df's static ranking is used.
+    `fills` (a FillModel, default FILL_PATH) decides bars touching both exits.
+    `trades` collects trade rows (a list by default, or a streaming writer);
+    if `equity` is given, one mark-to-market snapshot per bar is appended to it.
+    Open positions live in a PositionBook indexed by grid column; buys go
+    through the params' portfolio caps (a RiskEngine) unless all are off.
+    `checkpoint` (a sim_checkpoint.Checkpointer; needs streaming writers)
+    periodically saves the loop state; `resume` is such a saved state, and
+    the loop picks up at the bar after it. A `stats` Counter gets the work
+    done: bars, grid cells scanned, rotations, position-bars checked, fills.
+    """
+    fills = fills or FillModel(FILL_PATH)
+    p = params or default_params()
+    max_pairs = p['MAX_PAIRS']
+    symbols, sym_index = grid['symbols'], grid['sym_index']
+    cash = p['START_USDT']
+    book = PositionBook(len(symbols))
+    risk = RiskEngine.from_params(len(symbols), p, 86400 // parse_timeframe(RESOLUTION))
+    trades = [] if trades is None else trades
+    if equity is not None:
+        # positions are marked at the last close actually seen, never a later bar's
+        exact = grid['valid'] & (grid['ts'] == grid['timeline'][:, None])
+        mark = np.full(len(symbols), np.nan)
+    last_recalc = None
+    start = 0
+    recalcs = checked = 0
+    if resume is not None:
+        book.restore(resume['book'])
+        if risk is not None:
+            risk.restore(resume['risk'])
+        if equity is not None:
+            mark[:] = resume['mark']
+        cash, last_recalc, enabled, start = resume['cash'], resume['last_recalc'], resume['enabled'], resume['row']
+    entries0, open0 = book.n_entries, book.n_open
+    for i, ts in enumerate(grid['timeline'].tolist()[start:], start):
+        if last_recalc is None or (ts - last_recalc) >= recalc_interval*1000:
+            if scores is not None:
+                # pick top MAX_PAIRS by the score as of this bar
+                enabled = np.argsort(-scores[i], kind='stable')[:max_pairs]
+            else:
+                # pick top MAX_PAIRS by precomputed score (static)
+                enabled = np.array([sym_index[s] for s in cand_df.head(max_pairs)['symbol'].tolist()], dtype=np.intp)
+            if risk is not None:
+                risk.rotate(enabled, book)
+            last_recalc = ts
+            recalcs += 1
+        bar = {k: grid[k][i] for k in BAR_FIELDS}
+        # for each enabled symbol not already held, try to buy at next candle open (if available)
+        cash = enter_positions(book, enabled, bar, cash, p, trades, symbols, risk, fills.costs)
+        checked += book.n_open
+        # check exits for every open position at once using current candle high/low
+        cash = exit_positions(book, bar, cash, p, fills, trades, symbols)
+        if risk is not None:
+            risk.update(grid['close'][i], bar['valid'] & (bar['ts'] == ts))
+        if equity is not None:
+            seen = exact[i]
+            mark[seen] = grid['close'][i, seen]
+            invested = book.value(mark, fallback=book.entry_price)
+            equity.append({'ts': ts, 'cash': cash, 'invested': invested, 'equity': cash + invested, 'positions': len(book)})
+        if checkpoint is not None and checkpoint.due():
+            checkpoint.save({
+                'row': i + 1, 'cash': cash, 'last_recalc': last_recalc, 'enabled': enabled, 'book': book.state(),
+                'risk': risk.state() if risk is not None else None,
+                'mark': mark if equity is not None else None,
+                'trades': trades.checkpoint(), 'equity': equity.checkpoint() if equity is not None else None,
+            })
+    if stats is not None:
+        bars = len(grid['timeline']) - start
+        buys = book.n_entries - entries0
+        stats.update(bars=bars, cells=bars * len(symbols), recalcs=recalcs, position_bars=checked,
+                     buys=buys, sells=buys - (book.n_open - open0))
+        if risk is not None:
+            stats.update({f'blocked_{k}': v for k, v in risk.blocked.items()})
+    return cash, book, trades
+
+def mark_to_market(grid, cash, book, start_usdt):
+    # at end, mark unrealized positions priced at last close
+    final_value = cash + book.value(grid['last_close'])
+    total_return = (final_value - start_usdt)/start_usdt
+    return final_value, total_return
+
+# Data + scoring stages
+
+def load_universe(ex, top_n, prof=None):
+    prof = prof or Profiler()
     # load markets
-    markets = ex.load_markets()
+    with prof.stage('markets'):
+        markets = ex.load_markets()
     usdt_symbols = [s for s,m in markets.items() if isinstance(m, dict) and m.get('spot') and s.endswith('/USDT')]
     print('Total USDT symbols:', len(usdt_symbols))
     # fetch tickers to rank by quoteVolume
-    tickers = ex.fetch_tickers(usdt_symbols)
+    with prof.stage('tickers'):
+        tickers = ex.fetch_tickers(usdt_symbols)
     rows = []
     for sym in usdt_symbols:
         t = tickers.get(sym, {})
         qv = safe_float(t.get('quoteVolume'))
         rows.append((sym, qv))
     rows = sorted(rows, key=lambda x: (-(x[1] if not np.isnan(x[1]) else 0)))
-    top = [r[0] for r in rows[:TOP_N]]
+    top = [r[0] for r in rows[:top_n]]
     print('Top symbols:', len(top))
-    # time range
-    end = int(time.time()*1000)
-    start = end - DAYS*24*60*60*1000
-    # fetch 15m ohlcv for each top symbol
+    return top, tickers
+
+def window_start(ex):
+    # start of the backtest window, DAYS back from the source clock
+    return ex.milliseconds() - DAYS*24*60*60*1000
+
+def fetch_universe_ohlcv(ex, symbols, stats=None):
+    start = window_start(ex)
+    # fetch 15m ohlcv for every top symbol in one concurrent batch
     ohlcvs = {}
-    for s in top:
-        try:
-            df = fetch_ohlcv_df(ex, s, RESOLUTION, since=start, limit=20000)
+    for s, df in fetch_ohlcv_dfs(ex, symbols, RESOLUTION, since=start, limit=None, stats=stats).items():
+        if isinstance(df, Exception):
+            print('fetch error', s, df)
+        else:
             ohlcvs[s] = df
-            time.sleep(ex.rateLimit/1000)
-        except Exception as e:
-            print('fetch error', s, e)
-    # Build per-symbol daily pump/retrace and simple vol spike from 1h
+    return ohlcvs
+
+def fetch_sub_bars(ex, symbols, timeframe='1m'):
+    # lower-timeframe candles for the subbar fill path; symbols that fail just fall back to worst case
+    frames = fetch_ohlcv_dfs(ex, symbols, timeframe, since=window_start(ex), limit=None)
+    frames = {s: df for s, df in frames.items() if not isinstance(df, Exception)}
+    return SubBars(symbols, frames, sub_ms=ex.parse_timeframe(timeframe)*1000)
+
+def make_fill_model(ex, symbols):
+    sub_bars = fetch_sub_bars(ex, symbols) if FILL_PATH == 'subbar' else None
+    costs = BookCosts(symbols, fetch_order_books(ex, symbols)) if SLIPPAGE_MODEL == 'book' else None
+    return FillModel(FILL_PATH, sub_bars, bar_ms=ex.parse_timeframe(RESOLUTION)*1000, costs=costs)
+
+def build_candidates(bars, tickers):
+    # Build per-symbol daily pump/retrace and simple vol spike from 1h, all resampled from the base candles
     candidates = []
-    for s, df in ohlcvs.items():
+    for s, df in bars.frames.items():
         try:
-            pump, retr = jon_impulse_retrace_1d(ex, s.replace('/',''), window_days=35)
+            pump, retr = jon_impulse_retrace_1d(bars, s, window_days=35)
         except:
             pump, retr = np.nan, np.nan
-        # vol spike: compare last 24 x 1h to prev 7 days avg using 1h candles: approximate using 15m res
+        # vol spike: compare last 24 x 1h to prev 7 days avg using completed 1h candles
+        # (a still-forming last hour would make last24 cover less than 24h)
         try:
-            vol = df['volume'].to_numpy(dtype=float)
-            if len(vol) >= 24*4+7*24*4:
-                last24 = vol[-24*4:].sum()
-                prev = vol[-(24*4 + 7*24*4):-24*4]
-                chunks = prev.reshape(7,24*4)
+            vol = bars.get(s, '1h', complete=True)['volume'].to_numpy(dtype=float)
+            if len(vol) >= 24+7*24:
+                last24 = vol[-24:].sum()
+                prev = vol[-(24 + 7*24):-24]
+                chunks = prev.reshape(7,24)
                 avg24 = chunks.sum(axis=1).mean()
                 vol_spike = last24/avg24 if avg24>0 else np.nan
             else:
@@ -147,94 +602,112 @@ def simulate():
         score = score_row(retr, vol_spike, wick, rng24, spr, pump, np.nan)
         candidates.append({'symbol': s, 'score': score, 'retrace': retr})
     cand_df = pd.DataFrame(candidates).sort_values('score', ascending=False).reset_index(drop=True)
-    # rotation per time step: iterate over time index (aligned to 15m) from start to end
-    # build unified timeline from union of timestamps across symbols
-    all_ts = set()
-    for df in ohlcvs.values():
-        all_ts.update(df['ts'].tolist())
-    timeline = sorted(list(all_ts))
-    # maintain portfolio
-    cash = START_USDT
-    positions = {}  # symbol -> {entry_ts, entry_price, size_usdt, qty}
-    trades = []
-    # simple rotation rule: every 4 hours recalc top candidates and enable BUY for top MAX_PAIRS
-    step_seconds = 15*60
-    recalc_interval = 4*60*60 # 4 hours
-    last_recalc = None
-    for t in timeline:
-        ts = int(pd.Timestamp(t).timestamp()*1000)
-        if last_recalc is None or (ts - last_recalc) >= recalc_interval*1000:
-            # pick top MAX_PAIRS by precomputed score (static here)
-            enabled = cand_df.head(MAX_PAIRS)['symbol'].tolist()
-            last_recalc = ts
-        # for each enabled symbol not already in positions, try to buy at next candle open (if available)
-        for sym in enabled:
-            if sym in positions: continue
-            df = ohlcvs.get(sym)
-            # find row with ts >= current
-            row = df[df['ts'] >= pd.to_datetime(t)].head(1)
-            if row.empty: continue
-            openp = float(row['open'].iloc[0])
-            # compute qty for PER_BUY after slippage and fee
-            effective_price = openp*(1+SLIPPAGE)
-            usdt_available = cash if cash>0 else 0
-            if usdt_available < PER_BUY: continue
-            qty = (PER_BUY*(1 - FEE_RATE)) / effective_price
-            cash -= PER_BUY
-            positions[sym] = {'entry_ts': int(row['ts'].iloc[0].timestamp()*1000), 'entry_price': effective_price, 'size_usdt': PER_BUY, 'qty': qty}
-            trades.append({'symbol': sym, 'side':'BUY', 'ts': int(row['ts'].iloc[0].timestamp()*1000), 'price': effective_price, 'usdt': PER_BUY, 'qty': qty})
-        # check exits for positions using current candle high/low
-        to_remove = []
-        for sym,p in positions.items():
-            df = ohlcvs.get(sym)
-            # find row at this timestamp
-            row = df[df['ts'] >= pd.to_datetime(t)].head(1)
-            if row.empty: continue
-            high = float(row['high'].iloc[0]); low=float(row['low'].iloc[0]); openp=float(row['open'].iloc[0]); close=float(row['close'].iloc[0])
-            entry = p['entry_price']
-            target_price = entry*(1+GAIN_TARGET)
-            stop_price = entry*(1+STOP_LOSS)
-            exited = False
-            exit_price = None
-            exit_ts = int(row['ts'].iloc[0].timestamp()*1000)
-            # assume if high >= target then exited at target (minus slippage/fee)
-            if high >= target_price:
-                exit_price = target_price*(1 - SLIPPAGE)*(1 - FEE_RATE)
-                exited = True
-                reason = 'GAIN'
-            elif low <= stop_price:
-                exit_price = stop_price*(1 - SLIPPAGE)*(1 - FEE_RATE)
-                exited = True
-                reason = 'STOP'
-            if exited:
-                usdt_in = p['size_usdt']
-                usdt_out = p['qty'] * exit_price
-                profit = usdt_out - usdt_in
-                cash += usdt_out
-                trades.append({'symbol': sym, 'side':'SELL', 'ts': exit_ts, 'price': exit_price, 'usdt': usdt_out, 'qty': p['qty'], 'pnl': profit, 'reason': reason})
-                to_remove.append(sym)
-        for r in to_remove:
-            positions.pop(r, None)
-    # at end, mark unrealized positions priced at last close
-    unreal = 0.0
-    for sym,p in positions.items():
-        df = ohlcvs.get(sym)
-        last_close = float(df['close'].iloc[-1])
-        unreal += p['qty'] * last_close
-    final_value = cash + unreal
-    total_return = (final_value - START_USDT)/START_USDT
-    # summarize
-    trades_df = pd.DataFrame(trades)
-    trades_df.to_csv('trade_log.csv', index=False)
+    return cand_df
+
+# Simulator engine (15m resolution)
+
+def run_config():
+    # module settings a checkpoint must be resumed under (params travel separately)
+    return {k: globals()[k] for k in ('DAYS', 'RESOLUTION', 'RECALC_INTERVAL', 'FILL_PATH', 'SLIPPAGE_MODEL',
+                                      'OUTPUT_FORMAT', 'ROLLING_SCORES', 'UNIVERSE')}
+
+def simulate(params=None, source=None, checkpoint=None, resume=None, prof=None):
+    """Full run: universe, candles, scores, bar loop, outputs.
+
+    `checkpoint` (a Checkpointer) saves the loop state as it goes; `resume`
+    is a (state, meta) pair from load_checkpoint, run against the same source.
+    Stage timings and counters go to `prof` (a sim_profile.Profiler) and
+    into summary.json.
+    """
+    prof = prof or Profiler()
+    if resume is not None:
+        state, meta = resume
+        if meta['config'] != run_config():
+            raise SystemExit(f"checkpoint was written under {meta['config']}, not {run_config()}")
+        params = meta['params']
+    p = params or default_params()
+    ex = source or open_source()
+    if checkpoint is not None:
+        checkpoint.meta.update(params=p, config=run_config())
+    if UNIVERSE == 'screener':
+        from sim_screener import screen_universe  # builds on this module's stages
+        with prof.stage('screener'):
+            top, tickers, ohlcvs, report = screen_universe(ex, p['TOP_N'], params=p)
+        print('Screener:', report['selected'], report['stages_sec'], report['cache'])
+        for tf, c in report['cache'].items():
+            prof.stats('screener').update({f'{tf}_{k}': v for k, v in c.items() if k != 'hit_rate'})
+    else:
+        top, tickers = load_universe(ex, p['TOP_N'], prof)
+        with prof.stage('candles') as stats:
+            ohlcvs = fetch_universe_ohlcv(ex, top, stats=stats)
+            stats['candles'] += sum(len(df) for df in ohlcvs.values())
+    with prof.stage('features') as stats:
+        bars = Resampler(ohlcvs, RESOLUTION)
+        cand_df = build_candidates(bars, tickers)
+        # rotation per time step: align every symbol once onto a dense (time, symbol) grid
+        grid = aligned_grid(ex, ohlcvs)
+        stats.update(symbols=len(grid['symbols']), timeline=len(grid['timeline']))
+    with prof.stage('scoring'):
+        # simple rotation rule: every 4 hours recalc top candidates and enable BUY for top MAX_PAIRS
+        scores = rolling_scores(grid, RECALC_INTERVAL, params=p) if ROLLING_SCORES else None
+    with prof.stage('fill_data'):
+        fills = make_fill_model(ex, grid['symbols'])
+    # trades and per-bar equity stream to disk in chunks as the loop runs
+    state = resume[0] if resume is not None else None
+    with trade_writer(OUTPUT_FORMAT, resume=state and state['trades']) as trade_log, \
+            equity_writer(OUTPUT_FORMAT, resume=state and state['equity']) as equity_curve:
+        if state is not None:
+            print(f"Resuming at bar {state['row']} of {len(grid['timeline'])}")
+        with prof.stage('loop') as stats:
+            cash, book, _ = run_bar_loop(grid, cand_df, RECALC_INTERVAL, p, scores, fills, trade_log, equity_curve,
+                                         checkpoint, state, stats)
+        # the writers flush as the loop goes; that time is booked to output, not the loop
+        prof.stages['loop'] -= trade_log.write_sec + equity_curve.write_sec
+    if checkpoint is not None:
+        checkpoint.clear()
+    with prof.stage('output') as stats:
+        stats.update(trade_rows=trade_log.rows_written, equity_rows=equity_curve.rows_written,
+                     chunks=trade_log.parts + equity_curve.parts)
+        final_value, total_return = mark_to_market(grid, cash, book, p['START_USDT'])
+        # summarize; metrics are computed back from the columnar output just written
+        metrics = analyze(read_output(trade_log.path), read_output(equity_curve.path), p['START_USDT'],
+                          parse_timeframe(RESOLUTION) * 1000)
+        per_symbol = metrics.pop('per_symbol')
+    prof.stages['output'] += trade_log.write_sec + equity_curve.write_sec
     summary = {
-        'start': START_USDT,
+        'start': p['START_USDT'],
         'end': final_value,
         'return_pct': total_return*100,
-        'trades': len(trades_df[trades_df['side']=='SELL']) if not trades_df.empty else 0,
+        'trades': trade_log.counts['SELL'],
+        **metrics,
     }
     with open('summary.json','w') as f:
-        json.dump(summary, f, indent=2)
+        json.dump(json_safe({**summary, 'per_symbol': per_symbol, 'profile': prof.report()}), f, indent=2)
     print('Done. Summary:', summary)
+    print('Stages (s):', prof.report()['stages_sec'])
 
 if __name__ == '__main__':
-    simulate()
+    # run as a script this module is __main__; modules that `import sim_wickgun_sim` (sim_screener,
+    # imported lazily by simulate) must get this copy, with the config below applied, not a fresh default one
+    sys.modules['sim_wickgun_sim'] = sys.modules[__name__]
+    ap = argparse.ArgumentParser(description='Wick-Magic rotation simulator')
+    ap.add_argument('--replay', metavar='DIR', help='run offline from a recorded replay directory')
+    ap.add_argument('--record', metavar='DIR', help='save the data this run uses as a replay directory')
+    ap.add_argument('--checkpoint', action='store_true', help=f'save the loop state to {CHECKPOINT_PATH} as the run goes')
+    ap.add_argument('--resume', action='store_true', help=f'continue the run saved in {CHECKPOINT_PATH}')
+    ap.add_argument('--profile', choices=sorted(PROFILE_PATHS), help='profile the whole run (see sim_profile)')
+    ap.add_argument('--profile-out', metavar='PATH', help='profile output (default: sim_profile.prof / .html)')
+    add_arguments(ap)
+    args = ap.parse_args()
+    configure(args, sys.modules[__name__])
+    with profiled(args.profile, args.profile_out):
+        if args.resume:
+            state, meta = load_checkpoint(CHECKPOINT_PATH)
+            # same candles as the interrupted run: its replay directory
+            simulate(source=open_source(meta['replay']), checkpoint=Checkpointer(meta=meta), resume=(state, meta))
+        elif args.checkpoint:
+            replay = args.replay or args.record or os.path.splitext(CHECKPOINT_PATH)[0] + '_replay'
+            source = open_source(args.replay, None if args.replay else replay)
+            simulate(source=source, checkpoint=Checkpointer(meta={'replay': replay}))
+        else:
+            simulate(source=open_source(args.replay, args.record))
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Replay regression tests for the simulator.
+
+Every run reads the checked-in replay sim_fixtures/replay (5 symbols, 470
+gap-free 15m bars, recorded with --record and re-timed onto one grid) and
+writes its outputs into a temp directory, so no exchange is needed:
+
+  python -m pytest -q test_sim_replay.py
+
+If a change is meant to move the results, rerun
+`python sim_wickgun_sim.py --replay sim_fixtures/replay` and update BASELINE.
+"""
+import os
+import json
+import hashlib
+import pytest
+
+import sim_wickgun_sim as sim
+from sim_data import open_source
+from sim_checkpoint import CHECKPOINT_PATH, Checkpointer, load_checkpoint
+from sim_paper import ReplayFeed, PaperTrader
+from sim_output import trade_writer
+
+REPLAY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sim_fixtures', 'replay')
+# default settings on REPLAY; trade_log.csv by md5 so any changed fill, fee or timestamp shows up
+BASELINE = {'end': 1013.7629725750163, 'trades': 327, 'trade_log_md5': '35d1498db349da6336ccc57936e94b67'}
+
+
+class Killed(Exception):
+    pass
+
+class KillAfter(Checkpointer):
+    """Saves once after bar `at`, then dies `later` bars on, like a kill between two checkpoints."""
+
+    def __init__(self, at, later):
+        super().__init__(every=0)
+        self.at, self.later, self.bar = at, later, 0
+
+    def due(self):
+        self.bar += 1
+        if self.bar == self.at + self.later:
+            raise Killed
+        return self.bar == self.at
+
+
+def md5(path):
+    with open(path, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+def run(path, **kw):
+    """simulate() on REPLAY with its outputs in `path`; -> summary.json"""
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        sim.simulate(source=open_source(REPLAY), **kw)
+        with open('summary.json') as f:
+            return json.load(f)
+    finally:
+        os.chdir(cwd)
+
+@pytest.fixture(scope='module')
+def backtest(tmp_path_factory):
+    path = tmp_path_factory.mktemp('backtest')
+    return path, run(path)
+
+
+def test_backtest_matches_baseline(backtest):
+    path, summary = backtest
+    assert summary['end'] == pytest.approx(BASELINE['end'], rel=1e-12)
+    assert summary['trades'] == BASELINE['trades']
+    assert md5(path / 'trade_log.csv') == BASELINE['trade_log_md5']
+
+def test_resume_reproduces_uninterrupted_run(backtest, tmp_path):
+    path, summary = backtest
+    # killed 40 bars after its checkpoint: rows written past it must be dropped on resume
+    with pytest.raises(Killed):
+        run(tmp_path, checkpoint=KillAfter(at=200, later=40))
+    state, meta = load_checkpoint(tmp_path / CHECKPOINT_PATH)
+    assert state['row'] == 200
+    resumed = run(tmp_path, checkpoint=Checkpointer(path=CHECKPOINT_PATH, meta=meta), resume=(state, meta))
+    assert not (tmp_path / CHECKPOINT_PATH).exists()
+    for name in ('trade_log.csv', 'equity_curve.csv'):
+        assert md5(tmp_path / name) == md5(path / name), name
+    assert resumed['end'] == summary['end']
+    assert resumed['trades'] == summary['trades']
+
+def test_paper_trader_matches_backtest(backtest, tmp_path, monkeypatch):
+    path, summary = backtest
+    monkeypatch.chdir(tmp_path)
+    ex = open_source(REPLAY)
+    top, _ = sim.load_universe(ex, sim.TOP_N)
+    feed = ReplayFeed(ex, top)
+    with trade_writer(sim.OUTPUT_FORMAT) as tw:
+        trader = PaperTrader(feed.symbols, sim.default_params(), sim.make_fill_model(ex, feed.symbols),
+                             trades=tw).run(feed)
+    assert md5(tmp_path / 'trade_log.csv') == md5(path / 'trade_log.csv')
+    assert trader.value() == pytest.approx(summary['end'], rel=1e-12)